@@ -0,0 +1,38 @@
+"""
+Prepares the storage backends the benchmarks run against.
+
+The backends themselves come from DataBase.create_backend, with the SQLite file in a
+temporary directory.
+"""
+from models.db.database import DataBase
+
+BACKENDS = ("memory", "sqlite", "postgres")
+
+
+async def prepare(db: DataBase, name: str, reset: bool) -> None:
+    """
+    Make sure a started PostgreSQL database is empty before a benchmark run.
+
+    The other backends start empty. A PostgreSQL database keeps its rows between
+    runs, so it is only emptied when asked to, and a run refuses to start on one
+    that has events.
+
+    Args:
+        db (DataBase): The started database.
+        name (str): One of BACKENDS.
+        reset (bool): Whether to empty the tables.
+
+    Returns:
+        None
+    """
+    if name != "postgres":
+        return
+    if reset:
+        await db.backend.pool.execute(
+            "TRUNCATE events, event_history, users RESTART IDENTITY"
+        )
+        await db.upcoming.reconcile()
+    elif await db.events.count():
+        raise SystemExit(
+            "DATABASE_URL has events, point it at a scratch database and pass --reset"
+        )
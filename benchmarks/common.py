@@ -0,0 +1,56 @@
+"""
+Fakes and statistics shared by the benchmark harnesses.
+"""
+from typing import Any, Callable, List, Optional, Tuple
+
+import discord
+
+
+class FakeAvatar:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+
+class FakeUser:
+    """
+    A user that records the reminders sent to them instead of calling the HTTP API.
+
+    Every reminder is recorded as its kind, "reminder" or "advance", the name of the
+    event and the time it arrived at, as read from `now`.
+    """
+
+    display_avatar = FakeAvatar()
+
+    def __init__(
+        self,
+        id: int,
+        now: Callable[[], Any],
+        deliveries: List[Tuple[str, str, Any]],
+    ) -> None:
+        self.id = id
+        self.display_name = f"user-{id}"
+        self.mention = f"<@{id}>"
+        self.now = now
+        self.deliveries = deliveries
+
+    async def send(
+        self,
+        *,
+        embed: Optional[discord.Embed] = None,
+        embeds: Optional[List[discord.Embed]] = None,
+        **_: Any,
+    ) -> None:
+        now = self.now()
+        if embed is not None:
+            # only the advance reminder has fields
+            kind = "advance" if embed.fields else "reminder"
+            self.deliveries.append((kind, embed.description, now))
+        for digest in embeds or []:
+            for field in digest.fields:
+                self.deliveries.append(("reminder", field.name, now))
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
@@ -0,0 +1,153 @@
+"""
+Benchmarks the cost of building command response embeds.
+
+Run from the repository root:
+
+    python -m benchmarks.embeds
+"""
+import timeit
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+
+from i18n.translator import translator
+from models.db.tables.event import Event, RecurInterval
+from models.embeds import DefaultEmbed, EmbedTemplates
+from utils import get_dt_now
+
+NUMBER = 20000
+
+user = SimpleNamespace(
+    display_name="user", display_avatar=SimpleNamespace(url="https://example.com")
+)
+event = Event(
+    id=1,
+    user_id=1,
+    name="Meeting",
+    when=get_dt_now() + timedelta(hours=1),
+    recur=True,
+    recur_interval=RecurInterval.WEEKLY,
+)
+
+
+def build_added(lang: str) -> DefaultEmbed:
+    """
+    Build the add response from scratch, translating every string.
+
+    Args:
+        lang (str): The language of the embed.
+
+    Returns:
+        DefaultEmbed: The embed.
+    """
+    embed = DefaultEmbed()
+    embed.title = translator.translate(lang, "commands.add.embed.title")
+    embed.add_field(
+        name=translator.translate(lang, "commands.add.embed.fields.name.name"),
+        value=event.name,
+        inline=False,
+    )
+    embed.add_field(
+        name=translator.translate(lang, "commands.add.embed.fields.when.name"),
+        value=f"{discord.utils.format_dt(event.when)}/{discord.utils.format_dt(event.when, 'R')}",
+        inline=False,
+    )
+    embed.add_field(
+        name=translator.translate(lang, "commands.add.embed.fields.recur.name"),
+        value=translator.translate(lang, "commands.add.embed.fields.recur.values.yes"),
+        inline=False,
+    )
+    embed.add_field(
+        name=translator.translate(
+            lang, "commands.add.embed.fields.recur_interval.name"
+        ),
+        value=translator.translate(
+            lang, "commands.add.embed.fields.recur_interval.values.2"
+        ),
+        inline=False,
+    )
+    embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+    return embed
+
+
+def build_reminder(lang: str) -> DefaultEmbed:
+    """
+    Build the reminder from scratch, translating every string.
+
+    Args:
+        lang (str): The language of the embed.
+
+    Returns:
+        DefaultEmbed: The embed.
+    """
+    embed = DefaultEmbed()
+    embed.title = translator.translate(lang, "event_reminder.embed.title")
+    embed.description = event.name
+    embed.set_footer(
+        text=f" ({translator.translate(lang, 'event_reminder.embed.recurring')})"
+    )
+    return embed
+
+
+def build_list(lang: str) -> DefaultEmbed:
+    """
+    Build the list response from scratch, translating every string.
+
+    Args:
+        lang (str): The language of the embed.
+
+    Returns:
+        DefaultEmbed: The embed.
+    """
+    embed = DefaultEmbed()
+    embed.title = translator.translate(lang, "commands.list.embed.title")
+    for listed in [event] * 10:
+        embed.add_field(
+            name=listed.name,
+            value=f"- {discord.utils.format_dt(listed.when)} ({discord.utils.format_dt(listed.when, 'R')})\n- ID: {listed.id}",
+            inline=False,
+        )
+    embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+    embed.set_footer(
+        text=translator.translate(lang, "commands.list.embed.footer").format(total=10)
+    )
+    return embed
+
+
+def build_deleted(lang: str) -> DefaultEmbed:
+    """
+    Build the delete response from scratch, translating every string.
+
+    Args:
+        lang (str): The language of the embed.
+
+    Returns:
+        DefaultEmbed: The embed.
+    """
+    embed = DefaultEmbed()
+    embed.title = translator.translate(lang, "commands.delete.embed.title")
+    embed.set_footer(text=translator.translate(lang, "commands.delete.embed.footer"))
+    embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+    return embed
+
+
+def main() -> None:
+    templates = EmbedTemplates()
+    cases = {
+        "add (rebuilt)": lambda: build_added("zh-TW"),
+        "add (template)": lambda: templates.event_added("zh-TW", event, user),
+        "reminder (rebuilt)": lambda: build_reminder("zh-TW"),
+        "reminder (template)": lambda: templates.event_reminder("zh-TW", event),
+        "list (rebuilt)": lambda: build_list("zh-TW"),
+        "list (template)": lambda: templates.event_list("zh-TW", [event] * 10, 10, user),
+        "delete (rebuilt)": lambda: build_deleted("zh-TW"),
+        "delete (template)": lambda: templates.event_deleted("zh-TW", user),
+    }
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=NUMBER)
+        print(f"{name:<24}{seconds / NUMBER * 1e6:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Load tests the bot offline with simulated interactions.
+
+The harness builds ScheduleBot without connecting to Discord: the gateway is never
+opened and users are fakes that record the DMs sent to them. Interactions are built
+from gateway payloads and dispatched through the command tree, so the checks,
+transformers and error handlers run as they would live, and their responses go
+through a webhook adapter that records when they were sent. It fires a mix of add, list, delete and
+autocomplete interactions at a fixed rate while reminders come due, then reports the
+throughput, the latency of each command and how late the reminders were delivered.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --rate 200 --duration 10 --reminders 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import count
+from typing import Any, Dict, List, Tuple
+
+import discord
+from discord import app_commands
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+from benchmarks.backends import BACKENDS, prepare
+from benchmarks.common import FakeUser, percentile
+from models.db.database import DataBase
+from models.db.tables.event import Event
+from models.limiter import RateLimited
+from run import ScheduleBot
+from utils import get_dt_now
+
+
+class RecordingAdapter(AsyncWebhookAdapter):
+    """
+    The webhook adapter interactions respond through, recording when each interaction
+    was last responded to instead of calling the HTTP API.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.responded: Dict[str, float] = {}
+
+    async def create_interaction_response(
+        self, interaction_id: int, token: str, **_: Any
+    ) -> None:
+        self.responded[token] = time.perf_counter()
+
+    async def execute_webhook(self, webhook_id: int, token: str, **_: Any) -> None:
+        self.responded[token] = time.perf_counter()
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.mix = self.parse_mix(args.mix)
+        self.deliveries: List[Tuple[str, str, float]] = []
+        self.due: Dict[str, float] = {}
+        self.users = {
+            id: FakeUser(id, time.time, self.deliveries)
+            for id in range(1, args.users + 1)
+        }
+        self.deletable: List[int] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.rejected: Dict[str, int] = defaultdict(int)
+        self.deferred: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.metrics: Counter = Counter()
+        self.adapter = RecordingAdapter()
+        self.ids = count(1)
+
+    @staticmethod
+    def parse_mix(mix: str) -> Dict[str, int]:
+        weights = {}
+        for part in mix.split(","):
+            kind, weight = part.split("=")
+            if kind not in ("add", "list", "delete", "autocomplete"):
+                raise ValueError(f"Invalid interaction kind: {kind}")
+            weights[kind] = int(weight)
+        return weights
+
+    async def build_bot(self, path: str) -> ScheduleBot:
+        bot = ScheduleBot()
+        bot.db = DataBase(DataBase.create_backend(self.args.backend, path))
+        # what login() would do, without the gateway
+        await bot._async_setup_hook()
+        await bot.db.start()
+        await prepare(bot.db, self.args.backend, self.args.reset)
+        bot.get_user = self.users.get  # type: ignore
+        for user_id in random.sample(
+            list(self.users), int(len(self.users) * self.args.digest_users)
+        ):
+            await bot.db.users.set_digest(user_id, True)
+        await bot.load_extension("cogs.auto_task")
+        await bot.load_extension("cogs.schedule")
+        bot.tree.error(self.on_tree_error)
+        return bot
+
+    @staticmethod
+    async def on_tree_error(
+        i: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        # the cog has told the user already, the harness only counts it
+        i.extras["error"] = error
+
+    async def preload(self, bot: ScheduleBot) -> float:
+        """
+        Add the reminders due during the run and the events the delete interactions remove.
+
+        Returns:
+            float: The time at which the run starts, the first reminder is due then.
+        """
+        now = get_dt_now()
+        start = now + timedelta(seconds=self.args.lead)
+        for n in range(self.args.reminders):
+            when = start + timedelta(
+                seconds=self.args.duration * n / max(1, self.args.reminders)
+            )
+            event = Event(
+                user_id=random.choice(list(self.users)),
+                name=f"reminder-{n}",
+                when=when,
+                recur=False,
+            )
+            # the event is truncated to seconds
+            self.due[event.name] = event.when.timestamp()
+            await bot.db.events.add(event)
+        for user_id in self.users:
+            for n in range(self.args.events_per_user):
+                id = await bot.db.events.add(
+                    Event(
+                        user_id=user_id,
+                        name=f"event-{user_id}-{n}",
+                        when=now + timedelta(days=1 + n),
+                        recur=False,
+                    )
+                )
+                self.deletable.append(id)
+        random.shuffle(self.deletable)
+        return start.timestamp()
+
+    def payload(self, kind: str, user_id: int) -> Dict[str, Any]:
+        """
+        Build the gateway payload of an interaction, as Discord would send it.
+
+        Args:
+            kind (str): One of the interaction kinds of the mix.
+            user_id (int): The user running the command.
+
+        Returns:
+            Dict[str, Any]: The payload.
+        """
+        if kind == "add":
+            options = [
+                {"type": 3, "name": "name", "value": "load test"},
+                {"type": 3, "name": "when", "value": "in 2 days"},
+            ]
+        elif kind == "delete":
+            id = self.deletable.pop() if self.deletable else 0
+            options = [{"type": 4, "name": "event", "value": id}]
+        elif kind == "autocomplete":
+            options = [{"type": 4, "name": "event", "value": "event", "focused": True}]
+        else:
+            options = []
+        command = "delete" if kind == "autocomplete" else kind
+        id = next(self.ids)
+        return {
+            "id": str(id),
+            "application_id": "1",
+            "type": 4 if kind == "autocomplete" else 2,
+            "token": f"token-{id}",
+            "version": 1,
+            "locale": "en-US",
+            "channel_id": "1",
+            "user": {
+                "id": str(user_id),
+                "username": f"user-{user_id}",
+                "discriminator": "0",
+                "avatar": None,
+            },
+            "data": {
+                "id": "1",
+                "name": "s",
+                "type": 1,
+                "options": [{"type": 1, "name": command, "options": options}],
+            },
+        }
+
+    async def interact(self, bot: ScheduleBot, kind: str) -> None:
+        payload = self.payload(kind, random.randint(1, self.args.users))
+        i = discord.Interaction(data=payload, state=bot._connection)
+        start = time.perf_counter()
+        # what the tree runs for every interaction from the gateway, awaited here
+        try:
+            await bot.tree._call(i)
+        except app_commands.AppCommandError as e:
+            await bot.tree._dispatch_error(i, e)
+        error = i.extras.get("error")
+        if isinstance(error, RateLimited):
+            self.rejected[kind] += 1
+            return
+        if error is not None or i.token not in self.adapter.responded:
+            self.errors[kind] += 1
+            return
+        if i.response.type is discord.InteractionResponseType.deferred_channel_message:
+            self.deferred[kind] += 1
+        self.latencies[kind].append(self.adapter.responded[i.token] - start)
+
+    async def fire(self, bot: ScheduleBot) -> float:
+        kinds = list(self.mix)
+        weights = list(self.mix.values())
+        interval = 1 / self.args.rate
+        tasks = []
+        start = time.perf_counter()
+        next_at = start
+        while next_at - start < self.args.duration:
+            kind = random.choices(kinds, weights)[0]
+            tasks.append(asyncio.create_task(self.interact(bot, kind)))
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    async def run(self) -> None:
+        # the tasks of the interactions inherit the adapter
+        async_context.set(self.adapter)
+        with tempfile.TemporaryDirectory() as tmp:
+            bot = await self.build_bot(os.path.join(tmp, "load_test.db"))
+            start = await self.preload(bot)
+            await bot.cogs["AutoTask"].load_events()
+            if time.time() > start:
+                print("warning: preloading took longer than --lead, early reminders were missed")
+            await asyncio.sleep(max(0.0, start - time.time()))
+
+            elapsed = await self.fire(bot)
+            # give the last reminders time to arrive
+            deadline = time.time() + self.args.grace
+            while len(self.deliveries) < len(self.due) and time.time() < deadline:
+                await asyncio.sleep(0.1)
+
+            auto_task = bot.cogs["AutoTask"]
+            self.metrics = auto_task.metrics
+            for loop in (
+                auto_task.load_events_task,
+                auto_task.maintenance_task,
+                auto_task.refresh_index_task,
+            ):
+                loop.cancel()
+            await bot.db.close()
+        self.report(elapsed)
+
+    def report(self, elapsed: float) -> None:
+        completed = sum(len(values) for values in self.latencies.values())
+        print(
+            f"backend {self.args.backend}, {self.args.users} users, "
+            f"target {self.args.rate:g}/s for {self.args.duration:g}s"
+        )
+        print(f"throughput {completed / elapsed:.1f} interactions/s")
+        print(
+            f"{'kind':<14}{'done':>7}{'rejected':>10}{'deferred':>10}{'errors':>8}"
+            f"{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for kind in self.mix:
+            values = self.latencies[kind]
+            print(
+                f"{kind:<14}{len(values):>7}{self.rejected[kind]:>10}"
+                f"{self.deferred[kind]:>10}{self.errors[kind]:>8}"
+                f"{percentile(values, 50) * 1e3:>10.2f}{percentile(values, 99) * 1e3:>10.2f}"
+            )
+
+        delivered = {name: at for _, name, at in self.deliveries}
+        lateness = [
+            delivered[name] - due for name, due in self.due.items() if name in delivered
+        ]
+        print(f"reminders delivered {len(lateness)}/{len(self.due)}")
+        if lateness:
+            print(
+                f"lateness p50 {statistics.median(lateness) * 1e3:.2f} ms, "
+                f"p99 {percentile(lateness, 99) * 1e3:.2f} ms, "
+                f"max {max(lateness) * 1e3:.2f} ms"
+            )
+        print(
+            f"DMs sent {self.metrics['messages']}, "
+            f"saved by digests {self.metrics['messages_saved']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="sqlite",
+        help="postgres connects to DATABASE_URL",
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="empty the postgres tables before the run"
+    )
+    parser.add_argument("--rate", type=float, default=100, help="interactions per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--reminders", type=int, default=2000, help="reminders due during the run")
+    parser.add_argument("--events-per-user", type=int, default=5, help="preloaded events per user")
+    parser.add_argument(
+        "--mix",
+        default="add=4,list=3,delete=1,autocomplete=2",
+        help="weights of the interaction kinds",
+    )
+    parser.add_argument(
+        "--lead", type=float, default=5, help="seconds reserved for preloading before the run"
+    )
+    parser.add_argument(
+        "--digest-users", type=float, default=0, help="fraction of users in digest mode"
+    )
+    parser.add_argument("--grace", type=float, default=5, help="seconds to wait for late reminders")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(LoadTest(args).run())
+
+
+if __name__ == "__main__":
+    main()
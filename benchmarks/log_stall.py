@@ -0,0 +1,124 @@
+"""
+Benchmarks how long logging stalls the event loop.
+
+A ticker task measures how late its wakeups are while another task logs in bursts,
+first with the handlers attached directly to the root logger and then through the
+queue set up by models.log.setup_logging.
+
+Run from the repository root:
+
+    python -m benchmarks.log_stall
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from typing import List
+
+from models.log import JSONFormatter, setup_logging
+
+BURSTS = 1000
+BURST_SIZE = 50
+# the pause between bursts, so the run lasts long enough for a few thousand ticks
+BURST_INTERVAL = 0.002
+TICK = 0.001
+
+
+async def measure() -> List[float]:
+    """
+    Log in bursts while measuring the lateness of a ticker.
+
+    Returns:
+        List[float]: The lateness of each tick in seconds.
+    """
+    lateness: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lateness.append(time.perf_counter() - start - TICK)
+
+    async def logger() -> None:
+        for burst in range(BURSTS):
+            for i in range(BURST_SIZE):
+                logging.info(
+                    "[Bench]Sent reminder",
+                    extra={"event_id": burst, "user_id": i, "latency": 0.01},
+                )
+            await asyncio.sleep(BURST_INTERVAL)
+        done.set()
+
+    task = asyncio.create_task(ticker())
+    await logger()
+    await task
+    return lateness
+
+
+def report(name: str, lateness: List[float], seconds: float) -> None:
+    """
+    Print the lateness percentiles of a run and how long it took.
+
+    Args:
+        name (str): The name of the run.
+        lateness (List[float]): The lateness of each tick in seconds.
+        seconds (float): The duration of the run, including the pauses between bursts.
+
+    Returns:
+        None
+    """
+    lateness.sort()
+    print(
+        f"{name:<8}"
+        f"{seconds:6.2f} s  "
+        f"{len(lateness):6d} ticks  "
+        f"p50 lag {statistics.median(lateness) * 1e3:6.3f} ms  "
+        f"p99 lag {lateness[int(len(lateness) * 0.99)] * 1e3:6.3f} ms  "
+        f"max lag {lateness[-1] * 1e3:6.3f} ms"
+    )
+
+
+def main() -> None:
+    stderr = sys.stderr
+    # the console handlers write to a sink so the terminal doesn't slow them down
+    sys.stderr = open(os.devnull, "w")
+    root = logging.getLogger()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root.setLevel(logging.INFO)
+            file = RotatingFileHandler(
+                os.path.join(tmp, "sync.log"), maxBytes=10 * 1024 * 1024, backupCount=1
+            )
+            file.setFormatter(JSONFormatter())
+            root.addHandler(file)
+            root.addHandler(logging.StreamHandler())
+            start = time.perf_counter()
+            sync_lateness = asyncio.run(measure())
+            sync_seconds = time.perf_counter() - start
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+                handler.close()
+
+            listener = setup_logging(os.path.join(tmp, "queue.log"))
+            start = time.perf_counter()
+            queue_lateness = asyncio.run(measure())
+            queue_seconds = time.perf_counter() - start
+            listener.stop()
+            for handler in root.handlers[:] + list(listener.handlers):
+                root.removeHandler(handler)
+                handler.close()
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    report("sync", sync_lateness, sync_seconds)
+    report("queue", queue_lateness, queue_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Simulates days of reminders on a virtual clock.
+
+The harness builds ScheduleBot with a SimulatedClock, on the memory backend by default, adds
+one-off and recurring events with random advance reminders, then fast-forwards the
+clock through the load, refresh and maintenance loops, every recurrence and every
+delivery. It reports how many of the expected reminders arrived and how late they
+were in virtual time, which is deterministic for a given seed and start. It exits
+with status 1 if a reminder is missing or unexpected, so it can run as a lateness
+regression test.
+
+Run from the repository root:
+
+    python -m benchmarks.simulate --days 7 --events 2000
+"""
+import argparse
+import asyncio
+import random
+import os
+import statistics
+import tempfile
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from pytz import timezone
+
+from benchmarks.backends import BACKENDS, prepare
+from benchmarks.common import FakeUser, percentile
+from models.clock import SimulatedClock
+from models.db.database import DataBase
+from models.db.tables.event import Event, RecurInterval
+from run import ScheduleBot
+
+OFFSETS = [10, 60, 24 * 60]
+
+
+class Simulation:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.start = timezone("Asia/Taipei").localize(datetime.fromisoformat(args.start))
+        self.end = self.start + timedelta(days=args.days)
+        settle_delay = args.settle_delay
+        if settle_delay is None:
+            # the other backends wait on real I/O
+            settle_delay = 0.0 if args.backend == "memory" else 0.02
+        self.clock = SimulatedClock(
+            self.start, settle_rounds=args.settle_rounds, settle_delay=settle_delay
+        )
+        self.deliveries: List[Tuple[str, str, datetime]] = []
+        # how early a reminder may arrive, set from the digest window of the run
+        self.early = timedelta(0)
+        # recurring events are never finished, every one of them should be left
+        self.recurring = 0
+        self.recurring_left = 0
+        self.users = {
+            id: FakeUser(id, self.clock.now, self.deliveries)
+            for id in range(1, args.users + 1)
+        }
+        # the expected fire times of every event name, per kind
+        self.expected: Dict[str, Dict[str, List[datetime]]] = {
+            "reminder": defaultdict(list),
+            "advance": defaultdict(list),
+        }
+
+    async def build_bot(self, path: str) -> ScheduleBot:
+        bot = ScheduleBot()
+        bot.clock = self.clock
+        bot.db = DataBase(DataBase.create_backend(self.args.backend, path), self.clock)
+        # what login() would do, without the gateway
+        await bot._async_setup_hook()
+        await bot.db.start()
+        await prepare(bot.db, self.args.backend, self.args.reset)
+        bot.get_user = self.users.get  # type: ignore
+        for user_id in random.sample(
+            list(self.users), int(len(self.users) * self.args.digest_users)
+        ):
+            await bot.db.users.set_digest(user_id, True)
+        await bot.load_extension("cogs.auto_task")
+        return bot
+
+    def expect(self, event: Event) -> None:
+        """
+        Record when the reminders of an event should arrive during the simulation.
+        """
+        # an occurrence after the end can have advance reminders before it
+        while event.remind_at <= self.end:
+            if event.when <= self.end:
+                self.expected["reminder"][event.name].append(event.when)
+            for remind_at in event.fire_times()[:-1]:
+                # reminders due before the simulation starts are skipped
+                if self.start <= remind_at <= self.end:
+                    self.expected["advance"][event.name].append(remind_at)
+            if not event.recur:
+                break
+            event = event.copy(update={"when": event.next_when()})
+
+    async def preload(self, bot: ScheduleBot) -> None:
+        span = (self.end - self.start).total_seconds()
+        for n in range(self.args.events):
+            recur_interval = None
+            if random.random() < self.args.recurring:
+                recur_interval = random.choice(list(RecurInterval))
+            offsets = []
+            if random.random() < self.args.offsets:
+                offsets = random.sample(OFFSETS, random.randint(1, len(OFFSETS)))
+            event = Event(
+                user_id=random.choice(list(self.users)),
+                name=f"event-{n}",
+                when=self.start + timedelta(seconds=random.uniform(1, span)),
+                recur=recur_interval is not None,
+                recur_interval=recur_interval,
+                offsets=offsets,
+            )
+            self.expect(event)
+            await bot.db.events.add(event)
+            self.recurring += event.recur
+
+    async def run(self) -> bool:
+        with tempfile.TemporaryDirectory() as tmp:
+            bot = await self.build_bot(os.path.join(tmp, "simulate.db"))
+            await self.preload(bot)
+            auto_task = bot.cogs["AutoTask"]
+            # the bot would load them at the next tick, the simulation starts with a load
+            await auto_task.load_events()
+
+            start = time.perf_counter()
+            woken = await self.clock.advance(self.end - self.start)
+            elapsed = time.perf_counter() - start
+            self.early = timedelta(seconds=auto_task.digest_window)
+
+            for task in auto_task.simulated_loops + list(auto_task.scheduled.values()):
+                task.cancel()
+            self.recurring_left = sum(event.recur for event in await bot.db.events.get_all())
+            await bot.db.close()
+        return self.report(elapsed, woken, auto_task.metrics)
+
+    def report(self, elapsed: float, woken: int, metrics: Dict[str, int]) -> bool:
+        """
+        Print how many of the expected reminders arrived and how late they were.
+
+        Args:
+            elapsed (float): The real seconds the simulation took.
+            woken (int): The number of sleepers the clock woke.
+            metrics (Dict[str, int]): The metrics of the scheduler.
+
+        Returns:
+            bool: Whether every expected reminder arrived once, nothing else did and
+                no recurring event was lost.
+        """
+        passed = True
+        print(
+            f"simulated {self.args.days:g} days in {elapsed:.2f}s, "
+            f"{woken} wakeups, {self.args.events} events, {self.args.users} users"
+        )
+        delivered: Dict[str, Dict[str, List[datetime]]] = {
+            "reminder": defaultdict(list),
+            "advance": defaultdict(list),
+        }
+        for kind, name, at in self.deliveries:
+            delivered[kind][name].append(at)
+
+        for kind in ("reminder", "advance"):
+            lateness = []
+            duplicates = 0
+            for name, times in delivered[kind].items():
+                due = sorted(self.expected[kind].get(name, []))
+                matched = set()
+                early = self.early if kind == "reminder" else timedelta(0)
+                for at in times:
+                    # the latest due time before the delivery, or within a digest after it
+                    index = bisect_right(due, at + early) - 1
+                    if index < 0 or index in matched:
+                        duplicates += 1
+                        continue
+                    matched.add(index)
+                    lateness.append((at - due[index]).total_seconds())
+            expected = sum(len(times) for times in self.expected[kind].values())
+            passed = passed and len(lateness) == expected and not duplicates
+            print(
+                f"{kind:<9} delivered {len(lateness)}/{expected}, "
+                f"unexpected {duplicates}, lateness p50 {statistics.median(lateness or [0]):.1f}s "
+                f"p99 {percentile(lateness, 99):.1f}s max {max(lateness or [0]):.1f}s"
+            )
+        print(
+            f"DMs sent {metrics['messages']}, "
+            f"saved by digests {metrics['messages_saved']}"
+        )
+        print(f"recurring events left {self.recurring_left}/{self.recurring}")
+        return passed and self.recurring_left == self.recurring
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--start",
+        default="2024-12-28 00:00:00",
+        help="the virtual time the simulation starts at, in Asia/Taipei, by default "
+        "the run crosses the end of a month and a year",
+    )
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument(
+        "--recurring",
+        type=float,
+        default=0.3,
+        help="fraction of daily, weekly, monthly or yearly events",
+    )
+    parser.add_argument(
+        "--offsets", type=float, default=0.3, help="fraction of events with advance reminders"
+    )
+    parser.add_argument(
+        "--digest-users",
+        type=float,
+        default=0,
+        help="fraction of users in digest mode, their reminders can be up to the digest window early",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="memory",
+        help="postgres connects to DATABASE_URL, only memory is deterministic",
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="empty the postgres tables before the run"
+    )
+    parser.add_argument(
+        "--settle-rounds", type=int, default=20, help="loop turns after each wakeup"
+    )
+    parser.add_argument(
+        "--settle-delay",
+        type=float,
+        default=None,
+        help="real seconds after each wakeup, defaults to 0 for memory and 0.02 otherwise",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    if not asyncio.run(Simulation(args).run()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,121 @@
+import os
+from typing import Literal, Optional
+
 from discord.ext import commands
 
+from models.bot import Bot
+from models.db.backends.base import DataBaseStats
+from models.sync import CommandSyncer, SyncReport
+
 
 class Admin(commands.Cog):
-    def __init__(self, bot: commands.Bot) -> None:
+    def __init__(self, bot: Bot) -> None:
         self.bot = bot
-    
+        self.syncer = CommandSyncer(
+            bot, os.getenv("COMMAND_SYNC_STATE", "command_sync.json")
+        )
+
     @commands.is_owner()
-    @commands.command()
-    async def sync(self, ctx: commands.Context) -> None:
+    @commands.command(ignore_extra=False)
+    async def sync(
+        self,
+        ctx: commands.Context,
+        # optional, so "@bot sync force" skips the scope, anything else is rejected
+        scope: Optional[Literal["global", "guild"]] = None,
+        force: Optional[Literal["force"]] = None,
+    ) -> None:
         await ctx.send("Syncing...")
-        synced = await self.bot.tree.sync()
-        await ctx.send(f"Synced {len(synced)} commands.")
-    
-async def setup(bot: commands.Bot) -> None:
+        guild = ctx.guild if scope == "guild" else None
+        if scope == "guild" and guild is None:
+            await ctx.send("Guild commands can only be synced in a guild.")
+            return
+        report = await self.syncer.sync(guild, force=force is not None)
+        await ctx.send(f"```\n{self.format_sync_report(report)}\n```")
+
+    @staticmethod
+    def format_sync_report(report: SyncReport) -> str:
+        """
+        Format the result of a command tree sync for display.
+
+        Args:
+            report (SyncReport): The report to format.
+
+        Returns:
+            str: The formatted report.
+        """
+        lines = [f"Scope: {report.scope}", f"Upload: {report.mode}"]
+        for label, keys in (
+            ("Added", report.added),
+            ("Changed", report.changed),
+            ("Removed", report.removed),
+        ):
+            lines.append(f"{label}: {', '.join(keys) if keys else '-'}")
+        lines.append(
+            "Timings: "
+            + ", ".join(
+                f"{phase} {seconds * 1000:.1f} ms"
+                for phase, seconds in report.timings.items()
+            )
+        )
+        return "\n".join(lines)
+
+    @staticmethod
+    def format_stats(stats: DataBaseStats) -> str:
+        """
+        Format the database statistics for display.
+
+        Args:
+            stats (DataBaseStats): The statistics to format.
+
+        Returns:
+            str: The formatted statistics.
+        """
+        return (
+            f"Size: {stats.size / 1024:.1f} KiB\n"
+            f"Fragmentation: {stats.fragmentation:.1%}\n"
+            f"Events: {stats.events}\n"
+            f"History: {stats.history}"
+        )
+
+    @commands.is_owner()
+    @commands.command()
+    async def dbstats(self, ctx: commands.Context) -> None:
+        stats = await self.bot.db.stats()
+        await ctx.send(f"```\n{self.format_stats(stats)}\n```")
+
+    @commands.is_owner()
+    @commands.command()
+    async def dbmaintain(self, ctx: commands.Context) -> None:
+        await ctx.send("Running database maintenance...")
+        pruned = await self.bot.db.maintain()
+        stats = await self.bot.db.stats()
+        await ctx.send(
+            f"Pruned {pruned} history rows.\n```\n{self.format_stats(stats)}\n```"
+        )
+
+    @commands.is_owner()
+    @commands.command()
+    async def metrics(self, ctx: commands.Context) -> None:
+        auto_task = self.bot.cogs["AutoTask"]
+        metrics = auto_task.metrics
+        await ctx.send(
+            "```\n"
+            f"Scheduled events: {len(auto_task.scheduled)}\n"
+            f"Reminders: {metrics['reminders']}\n"
+            f"Advance reminders: {metrics['advance_reminders']}\n"
+            f"Messages sent: {metrics['messages']}\n"
+            f"Messages saved by digests: {metrics['messages_saved']}\n"
+            "```"
+        )
+
+async def setup(bot: Bot) -> None:
     """
     This function sets up the Admin cog.
 
     Args:
-        bot (commands.Bot): The bot instance.
+        bot (Bot): The bot instance.
 
     Returns:
         None
     """
-    await bot.add_cog(Admin(bot))
\ No newline at end of file
+    await bot.add_cog(Admin(bot))
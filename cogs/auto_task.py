@@ -1,22 +1,34 @@
 import asyncio
 import datetime
+import logging
+import os
+from collections import Counter
 from datetime import timedelta
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+import discord
 from discord.ext import commands, tasks
-from pytz import timezone
 
-from i18n.translator import translator
 from models.bot import Bot
-from models.db.tables.event import Event, RecurInterval
-from models.embeds import DefaultEmbed
-from utils import get_dt_now
+from models.clock import SimulatedClock
+from models.db.tables.event import Event
+from models.embeds import group_embeds, templates
 
 
 class AutoTask(commands.Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
         self.event_queue: List[Tuple[float, Event]] = []
+        # the pending task of every scheduled event, by event id
+        self.scheduled: Dict[int, asyncio.Task] = {}
+        # the events being reminded, their tasks have left the registry
+        self.firing: Set[int] = set()
+        self.digest_users: Set[int] = set()
+        self.digest_window = float(os.getenv("DIGEST_WINDOW", "60"))
+        # reminders: events reminded, advance_reminders: reminders sent before events,
+        # messages: DMs sent, messages_saved: DMs merged into digests
+        self.metrics: Counter = Counter()
+        self.simulated_loops: List[asyncio.Task] = []
 
     async def cog_load(self) -> None:
         """
@@ -25,7 +37,42 @@ class AutoTask(commands.Cog):
         Returns:
             None
         """
-        self.load_events_task.start()
+        self.digest_users = await self.bot.db.users.get_digest_users()
+        loops = (self.load_events_task, self.maintenance_task, self.refresh_index_task)
+        if isinstance(self.bot.clock, SimulatedClock):
+            self.simulated_loops = [
+                self.bot.loop.create_task(self.simulate_loop(loop)) for loop in loops
+            ]
+        else:
+            for loop in loops:
+                loop.start()
+
+    async def simulate_loop(self, loop: tasks.Loop) -> None:
+        """
+        This function runs a loop on the simulated clock, which tasks.loop doesn't know about.
+
+        Args:
+            loop (tasks.Loop): The loop to run.
+
+        Returns:
+            None
+        """
+        clock = self.bot.clock
+        while True:
+            if loop.time:
+                now = clock.now().astimezone(datetime.timezone.utc)
+                # the times are in UTC, the next run is today or tomorrow
+                runs = [
+                    datetime.datetime.combine(now.date() + timedelta(days=days), time)
+                    for days in (0, 1)
+                    for time in loop.time
+                ]
+                await clock.sleep_until(min(run for run in runs if run > now))
+            else:
+                await clock.sleep(
+                    loop.hours * 3600 + loop.minutes * 60 + loop.seconds
+                )
+            await loop.coro(self)
 
     times = [
         datetime.time(hour=0, minute=0, second=0),
@@ -42,38 +89,234 @@ class AutoTask(commands.Cog):
         """
         await self.load_events()
 
+    @tasks.loop(time=datetime.time(hour=20, minute=0, second=0))
+    async def maintenance_task(self) -> None:
+        """
+        This function is called every day to prune the event history and reclaim unused space.
+
+        Returns:
+            None
+        """
+        pruned = await self.bot.db.maintain(self.bot.clock.now())
+        logging.info(f"[AutoTask]Database maintenance done, pruned {pruned} history rows")
+
     async def load_events(self) -> None:
         """
-        This function loads all the events from the database.
+        This function loads the events with reminders in the next 12 hours from the upcoming index.
+
+        The index is reconciled against the database first. Each event gets one task,
+        however many advance reminders it has. An overdue event is only deleted if it
+        has no pending task and isn't being reminded, one that came due at this tick
+        is left to its task.
 
         Returns:
             None
         """
-        events = await self.bot.db.events.get_all()
-        for event in events:
-            now = datetime.datetime.now(tz=timezone("Asia/Taipei"))
+        now = self.bot.clock.now()
+        await self.bot.db.upcoming.reconcile(now)
+        until = now + timedelta(hours=12)
+        for event in self.bot.db.upcoming.get_until(until):
             if event.when < now:
-                await self.bot.db.events.delete(event.id)
-            elif now - event.when < timedelta(hours=12):
-                self.bot.loop.create_task(self.schedule_event(event))
+                if event.id in self.scheduled or event.id in self.firing:
+                    continue
+                async with self.bot.db.gate.priority():
+                    await self.bot.db.events.delete(event.id)
+            else:
+                # a pending task stops at the end of the previous window, replace it
+                self.schedule(event, until)
+
+    @tasks.loop(minutes=10)
+    async def refresh_index_task(self) -> None:
+        """
+        This function is called every 10 minutes to load the events entering the upcoming index.
+
+        Returns:
+            None
+        """
+        await self.bot.db.upcoming.refresh(self.bot.clock.now())
+
+    def schedule(
+        self,
+        event: Event,
+        until: Optional[datetime.datetime] = None,
+        since: Optional[datetime.datetime] = None,
+    ) -> None:
+        """
+        This function schedules an event, replacing the pending task of the event if there is one.
+
+        An event therefore never has more than one pending task, however many times it
+        is scheduled.
+
+        Args:
+            event (Event): The event to schedule, it must have an id.
+            until (datetime.datetime, optional): The end of the loading window, defaults to 12 hours from now.
+            since (datetime.datetime, optional): The advance reminders before it are skipped, defaults to now.
 
-    async def schedule_event(self, event: Event) -> None:
+        Returns:
+            None
+        """
+        self.unschedule(event.id)
+        task = self.bot.loop.create_task(self.schedule_event(event, until, since))
+        self.scheduled[event.id] = task
+        task.add_done_callback(lambda task: self.forget(event.id, task))
+
+    def unschedule(self, id: int) -> None:
+        """
+        This function cancels the pending task of an event.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            None
+        """
+        task = self.scheduled.pop(id, None)
+        if task is not None:
+            task.cancel()
+
+    def forget(self, id: int, task: asyncio.Task) -> None:
+        """
+        This function removes a task from the registry if it is still the pending task of the event.
+
+        Args:
+            id (int): The id of the event.
+            task (asyncio.Task): The task.
+
+        Returns:
+            None
         """
-        This function schedules an event.
+        if self.scheduled.get(id) is task:
+            del self.scheduled[id]
+
+    async def schedule_event(
+        self,
+        event: Event,
+        until: Optional[datetime.datetime] = None,
+        since: Optional[datetime.datetime] = None,
+    ) -> None:
+        """
+        This function schedules the reminders of an event up to the end of the loading window.
+
+        The offsets are expanded here, so the advance reminders after the window are
+        scheduled by a later call to load_events and the missed ones are skipped.
 
         Args:
             event (Event): The event to schedule.
+            until (datetime.datetime, optional): The end of the loading window, defaults to 12 hours from now.
+            since (datetime.datetime, optional): The advance reminders before it are skipped, defaults to now.
 
         Returns:
             None
         """
-        time_until_event = event.when - get_dt_now()
-        await asyncio.sleep(time_until_event.total_seconds())
-        await self.notify_user(event)
+        now = self.bot.clock.now()
+        until = until or now + timedelta(hours=12)
+        since = since or now
+        for remind_at in event.fire_times()[:-1]:
+            if remind_at > until:
+                return
+            if remind_at < since:
+                continue
+            await self.bot.clock.sleep_until(remind_at)
+            # a replacement task skips the reminders that are due, let this one finish
+            await asyncio.shield(self.notify_user_advance(event))
+        if event.when > until:
+            return
+
+        await self.bot.clock.sleep_until(event.when)
+        # the event fires now, it can't be cancelled or replaced halfway through
+        self.forget(event.id, asyncio.current_task())
+        if event.user_id in self.digest_users:
+            await self.send_digest(event)
+            return
+        self.firing.add(event.id)
+        try:
+            await self.notify_user(event)
+            await self.finish_event(event)
+        finally:
+            self.firing.discard(event.id)
+
+    async def finish_event(self, event: Event) -> None:
+        """
+        This function archives an event after the user was notified, and schedules its next occurrence.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+        async with self.bot.db.gate.priority():
+            await self.bot.db.history.archive(event)
         if event.recur:
             await self.schedule_recur(event)
-        else:
-            await self.bot.db.events.delete(event.id)
+
+    def take_digest_events(self, event: Event) -> List[Event]:
+        """
+        This function takes the events of a digest user that happen within the digest window after an event.
+
+        The events are looked up in the upcoming index and their pending tasks are
+        cancelled, so they are reminded together with the event. Events that still have
+        advance reminders to send are left to their tasks.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            List[Event]: The events taken, ordered by datetime.
+        """
+        now = self.bot.clock.now()
+        end = event.when + timedelta(seconds=self.digest_window)
+        events = []
+        for other in self.bot.db.upcoming.get_of_user(event.user_id):
+            if other.when > end:
+                break
+            if (
+                other.when < event.when
+                or other.id == event.id
+                or other.id in self.firing
+            ):
+                continue
+            fire_times = other.fire_times()
+            if len(fire_times) > 1 and fire_times[-2] >= now:
+                continue
+            self.unschedule(other.id)
+            events.append(other)
+        return events
+
+    async def send_digest(self, event: Event) -> None:
+        """
+        This function reminds a digest user of an event, together with their events that happen within the digest window.
+
+        The message is sent when the first event happens, the others are reminded
+        early rather than the first one late. An event that has nothing to merge with
+        is reminded on its own. The events are finished even if the message fails, their
+        own tasks were cancelled and they would be deleted as overdue otherwise.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+        # taken before the first await, so the tasks of the others can't fire meanwhile
+        events = [event] + self.take_digest_events(event)
+        self.firing.update(event.id for event in events)
+        try:
+            try:
+                if len(events) == 1:
+                    await self.notify_user(event)
+                else:
+                    await self.notify_user_digest(event.user_id, events)
+            except discord.HTTPException as e:
+                logging.error(
+                    f"[AutoTask]Failed to send digest: {e}",
+                    exc_info=e,
+                    extra={"user_id": event.user_id},
+                )
+            for event in events:
+                await self.finish_event(event)
+        finally:
+            self.firing.difference_update(event.id for event in events)
 
     async def schedule_recur(self, event: Event) -> None:
         """
@@ -85,24 +328,19 @@ class AutoTask(commands.Cog):
         Returns:
             None
         """
-        if event.recur_interval is RecurInterval.DAILY:
-            next_event = event.when + timedelta(days=1)
-        elif event.recur_interval is RecurInterval.WEEKLY:
-            next_event = event.when + timedelta(weeks=1)
-        elif event.recur_interval is RecurInterval.MONTHLY:
-            next_event = event.when.replace(month=event.when.month + 1)
-        elif event.recur_interval is RecurInterval.YEARLY:
-            next_event = event.when.replace(year=event.when.year + 1)
-        else:
-            raise ValueError("Invalid recur interval")
-
-        await self.bot.db.events.update(
-            event.id,
-            when=next_event,
-        )
-        event.when = next_event
-        if next_event - get_dt_now() < timedelta(hours=12):
-            self.bot.loop.create_task(self.schedule_event(event))
+        next_event = event.next_when()
+        async with self.bot.db.gate.priority():
+            updated = await self.bot.db.events.update(
+                event.id,
+                when=next_event,
+            )
+        if not updated:
+            # deleted while it fired, after unschedule could reach its task
+            return
+        previous, event.when = event.when, next_event
+        if event.remind_at - self.bot.clock.now() < timedelta(hours=12):
+            # advance reminders that came due while the previous occurrence fired are sent late
+            self.schedule(event, since=previous)
 
     async def notify_user(self, event: Event) -> None:
         """
@@ -118,15 +356,77 @@ class AutoTask(commands.Cog):
         if user is None:
             user = await self.bot.fetch_user(event.user_id)
 
-        embed = DefaultEmbed()
-        embed.title = translator.translate("en-US", "event_reminder.embed.title")
-        embed.description = event.name
-        if event.recur:
-            embed.set_footer(
-                text=f" ({translator.translate('en-US', 'event_reminder.embed.recurring')})"
-            )
+        embed = templates.event_reminder(event.locale, event)
 
         await user.send(embed=embed, content=user.mention)
+        self.metrics["reminders"] += 1
+        self.metrics["messages"] += 1
+        logging.info(
+            "[AutoTask]Sent reminder",
+            extra={
+                "event_id": event.id,
+                "user_id": event.user_id,
+                "latency": (self.bot.clock.now() - event.when).total_seconds(),
+            },
+        )
+
+    async def notify_user_advance(self, event: Event) -> None:
+        """
+        This function reminds the user of an event ahead of time.
+
+        Advance reminders are sent on their own, even to digest users.
+
+        Args:
+            event (Event): The event to remind the user about.
+
+        Returns:
+            None
+        """
+        user = self.bot.get_user(event.user_id)
+        if user is None:
+            user = await self.bot.fetch_user(event.user_id)
+
+        embed = templates.event_upcoming(event.locale, event)
+
+        await user.send(embed=embed, content=user.mention)
+        self.metrics["advance_reminders"] += 1
+        self.metrics["messages"] += 1
+        logging.info(
+            "[AutoTask]Sent advance reminder",
+            extra={"event_id": event.id, "user_id": event.user_id},
+        )
+
+    async def notify_user_digest(self, user_id: int, events: List[Event]) -> None:
+        """
+        This function notifies the user about several events in a single message.
+
+        Args:
+            user_id (int): The id of the user.
+            events (List[Event]): The events to notify the user about.
+
+        Returns:
+            None
+        """
+        user = self.bot.get_user(user_id)
+        if user is None:
+            user = await self.bot.fetch_user(user_id)
+
+        messages = group_embeds(templates.event_digest(events[0].locale, events))
+        for embeds in messages:
+            await user.send(embeds=embeds, content=user.mention)
+            self.metrics["messages"] += 1
+        self.metrics["reminders"] += len(events)
+        self.metrics["messages_saved"] += len(events) - len(messages)
+        now = self.bot.clock.now()
+        for event in events:
+            logging.info(
+                "[AutoTask]Sent reminder in digest",
+                extra={
+                    "event_id": event.id,
+                    "user_id": user_id,
+                    "latency": (now - event.when).total_seconds(),
+                },
+            )
 
 
 async def setup(bot: Bot) -> None:
@@ -1,6 +1,9 @@
+import asyncio
 import datetime
 import logging
-from typing import List, Optional
+import os
+import time
+from typing import Awaitable, List, Optional, Tuple, TypeVar
 
 import discord
 import parsedatetime
@@ -9,15 +12,123 @@ from discord.app_commands import locale_str as _T
 from discord.ext import commands
 from pytz import timezone
 
-from i18n.translator import translator
 from models.bot import Bot
 from models.db.tables.event import Event, RecurInterval
-from models.embeds import DefaultEmbed
+from models.embeds import templates
+from models.limiter import CommandLimiter, RateLimited
+from utils import parse_offsets
+
+T = TypeVar("T")
 
 
 class Schedule(commands.GroupCog, name="s"):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.limiter = CommandLimiter(
+            rate=float(os.getenv("COMMAND_RATE", "0.5")),
+            capacity=int(os.getenv("COMMAND_BURST", "5")),
+            max_in_flight=int(os.getenv("COMMAND_MAX_IN_FLIGHT", "8")),
+        )
+        self.latency_budget = float(os.getenv("COMMAND_DEFER_AFTER", "1.5"))
+
+    async def interaction_check(self, i: discord.Interaction) -> bool:
+        """
+        Take a token from the user's bucket before running any command of this cog.
+
+        Args:
+            i (discord.Interaction): The interaction.
+
+        Raises:
+            RateLimited: The user is running commands too fast.
+
+        Returns:
+            bool: Always True.
+        """
+        self.limiter.check(i.user.id)
+        return True
+
+    async def cog_app_command_error(
+        self, i: discord.Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        """
+        Tell the user when they are rate limited or their command failed.
+
+        The tree stops logging errors once a cog handles them, so every other error
+        is logged here.
+
+        Args:
+            i (discord.Interaction): The interaction.
+            error (app_commands.AppCommandError): The error that was raised.
+
+        Returns:
+            None
+        """
+        if isinstance(error, RateLimited):
+            embed = templates.rate_limited(i.locale.value, error.retry_after)
+        else:
+            logging.error(
+                f"[Schedule]Error in command {i.command.qualified_name if i.command else None}: {error}",
+                exc_info=error,
+                extra={"user_id": i.user.id},
+            )
+            embed = templates.command_failed(i.locale.value)
+        try:
+            if i.response.is_done():
+                await i.followup.send(embed=embed, ephemeral=True)
+            else:
+                await i.response.send_message(embed=embed, ephemeral=True)
+        except discord.HTTPException:
+            # the interaction may have expired, the error is logged either way
+            pass
+
+    async def run_db(
+        self, i: discord.Interaction, coro: Awaitable[T], *, read: bool = False
+    ) -> T:
+        """
+        Run the database work of a command under the in-flight cap.
+
+        If the work takes longer than the latency budget, the response is deferred
+        so the interaction doesn't expire while it waits.
+
+        Args:
+            i (discord.Interaction): The interaction.
+            coro (Awaitable[T]): The database work.
+            read (bool): Whether the work only reads, reads wait for scheduler writes.
+
+        Returns:
+            T: The result of the work.
+        """
+
+        async def run() -> T:
+            if read:
+                await self.bot.db.gate.wait()
+            async with self.limiter.in_flight:
+                return await coro
+
+        task = asyncio.ensure_future(run())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.latency_budget)
+        except asyncio.TimeoutError:
+            if not i.response.is_done():
+                await i.response.defer()
+            return await task
+
+    @staticmethod
+    async def respond(i: discord.Interaction, embed: discord.Embed) -> None:
+        """
+        Send the response, as a followup if it was deferred.
+
+        Args:
+            i (discord.Interaction): The interaction.
+            embed (discord.Embed): The embed to send.
+
+        Returns:
+            None
+        """
+        if i.response.is_done():
+            await i.followup.send(embed=embed)
+        else:
+            await i.response.send_message(embed=embed)
 
     @app_commands.command(
         name=_T("add", context="commands.add.name"),
@@ -29,6 +140,9 @@ class Schedule(commands.GroupCog, name="s"):
         recur_interval=_T(
             "recur_interval", context="commands.add.params.recur_interval.name"
         ),
+        remind_before=_T(
+            "remind_before", context="commands.add.params.remind_before.name"
+        ),
     )
     @app_commands.describe(
         name=_T("name", context="commands.add.params.name.description"),
@@ -36,6 +150,9 @@ class Schedule(commands.GroupCog, name="s"):
         recur_interval=_T(
             "recur_interval", context="commands.add.params.recur_interval.description"
         ),
+        remind_before=_T(
+            "remind_before", context="commands.add.params.remind_before.description"
+        ),
     )
     @app_commands.choices(
         recur_interval=[
@@ -74,11 +191,20 @@ class Schedule(commands.GroupCog, name="s"):
         name: str,
         when: str,
         recur_interval: Optional[int] = None,
+        remind_before: Optional[str] = None,
     ) -> None:
+        try:
+            offsets = parse_offsets(remind_before) if remind_before else []
+        except ValueError:
+            embed = templates.invalid_offsets(i.locale.value)
+            await i.response.send_message(embed=embed, ephemeral=True)
+            return
         converted_interval = RecurInterval(recur_interval) if recur_interval else None
         cal = parsedatetime.Calendar()
         datetime_obj, _ = cal.parseDT(
-            datetimeString=when, tzinfo=timezone("Asia/Taipei")
+            datetimeString=when,
+            sourceTime=self.bot.clock.now(),
+            tzinfo=timezone("Asia/Taipei"),
         )
         event = Event(
             user_id=i.user.id,
@@ -86,49 +212,26 @@ class Schedule(commands.GroupCog, name="s"):
             when=datetime_obj,
             recur=recur_interval is not None,
             recur_interval=converted_interval,
+            locale=i.locale.value,
+            offsets=offsets,
         )
-        logging.info(f"[{i.user.id}] Adding event: {event}")
-        await self.bot.db.events.add(event)
-
-        lang = i.locale.value
-        embed = DefaultEmbed()
-        embed.title = translator.translate(lang, "commands.add.embed.title")
-        embed.add_field(
-            name=translator.translate(lang, "commands.add.embed.fields.name.name"),
-            value=event.name,
-            inline=False,
+        start = time.perf_counter()
+        event.id = await self.run_db(i, self.bot.db.events.add(event))
+        logging.info(
+            f"[Schedule]Added event: {event}",
+            extra={
+                "event_id": event.id,
+                "user_id": i.user.id,
+                "latency": time.perf_counter() - start,
+            },
         )
-        embed.add_field(
-            name=translator.translate(lang, "commands.add.embed.fields.when.name"),
-            value=f"{discord.utils.format_dt(event.when)}/{discord.utils.format_dt(event.when, 'R')}",
-            inline=False,
-        )
-        embed.add_field(
-            name=translator.translate(lang, "commands.add.embed.fields.recur.name"),
-            value=translator.translate(
-                lang,
-                f"commands.add.embed.fields.recur.values.{'yes' if event.recur else 'no'}",
-            ),
-            inline=False,
-        )
-        if event.recur_interval:
-            embed.add_field(
-                name=translator.translate(
-                    lang, "commands.add.embed.fields.recur_interval.name"
-                ),
-                value=translator.translate(
-                    lang,
-                    f"commands.add.embed.fields.recur_interval.values.{event.recur_interval.value}",
-                ),
-                inline=False,
-            )
-        embed.set_author(name=i.user.display_name, icon_url=i.user.display_avatar.url)
-        await i.response.send_message(embed=embed)
 
-        now = datetime.datetime.now(tz=timezone("Asia/Taipei"))
-        if event.when - now < datetime.timedelta(hours=12):
-            cog = self.bot.cogs["AutoTask"]
-            self.bot.loop.create_task(cog.schedule_event(event))
+        embed = templates.event_added(i.locale.value, event, i.user)
+        await self.respond(i, embed)
+
+        now = self.bot.clock.now()
+        if event.remind_at - now < datetime.timedelta(hours=12):
+            self.bot.cogs["AutoTask"].schedule(event)
 
     @app_commands.command(
         name=_T("list", context="commands.list.name"),
@@ -138,23 +241,28 @@ class Schedule(commands.GroupCog, name="s"):
         ),
     )
     async def list(self, i: discord.Interaction) -> None:
-        events = await self.bot.db.events.get_all_of_user(i.user.id)
-        lang = i.locale.value
-        embed = DefaultEmbed()
-        embed.title = translator.translate(lang, "commands.list.embed.title")
-        for event in events[:10]:
-            embed.add_field(
-                name=event.name,
-                value=f"- {discord.utils.format_dt(event.when)} ({discord.utils.format_dt(event.when, 'R')})\n- ID: {event.id}",
-                inline=False,
-            )
-        embed.set_author(name=i.user.display_name, icon_url=i.user.display_avatar.url)
-        embed.set_footer(
-            text=translator.translate(lang, "commands.list.embed.footer").format(
-                total=len(events)
-            )
+        events, total = await self.run_db(
+            i, self.get_recent_events(i.user.id), read=True
         )
-        await i.response.send_message(embed=embed)
+        embed = templates.event_list(i.locale.value, events, total, i.user)
+        await self.respond(i, embed)
+
+    async def get_recent_events(self, user_id: int) -> Tuple[List[Event], int]:
+        """
+        Get the 10 most recent events of a user and how many events they have.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            Tuple[List[Event], int]: The events and the total number of events.
+        """
+        events = self.bot.db.upcoming.get_of_user(user_id)
+        if len(events) >= 10:
+            return events[:10], await self.bot.db.events.count_of_user(user_id)
+        # the user's later events are outside the upcoming index
+        events = await self.bot.db.events.get_all_of_user(user_id)
+        return events[:10], len(events)
 
     @app_commands.command(
         name=_T("delete", context="commands.delete.name"),
@@ -166,38 +274,67 @@ class Schedule(commands.GroupCog, name="s"):
     @app_commands.rename(event=_T("event", context="commands.delete.params.event.name"))
     @app_commands.describe(event=_T("event", context="commands.delete.params.event.description"))
     async def delete(self, i: discord.Interaction, event: int) -> None:
-        await self.bot.db.events.delete(event)
-        lang = i.locale.value
-        embed = DefaultEmbed()
-        embed.title = translator.translate(lang, "commands.delete.embed.title")
-        embed.set_footer(
-            text=translator.translate(lang, "commands.delete.embed.footer")
-        )
-        embed.set_author(name=i.user.display_name, icon_url=i.user.display_avatar.url)
-        await i.response.send_message(embed=embed)
-    
+        await self.run_db(i, self.bot.db.events.delete(event))
+        self.bot.cogs["AutoTask"].unschedule(event)
+        embed = templates.event_deleted(i.locale.value, i.user)
+        await self.respond(i, embed)
+
+    @app_commands.command(
+        name=_T("digest", context="commands.digest.name"),
+        description=_T(
+            "Receive reminders that happen together in a single message",
+            context="commands.digest.description",
+        ),
+    )
+    @app_commands.rename(
+        enabled=_T("enabled", context="commands.digest.params.enabled.name")
+    )
+    @app_commands.describe(
+        enabled=_T("enabled", context="commands.digest.params.enabled.description")
+    )
+    async def digest(self, i: discord.Interaction, enabled: bool) -> None:
+        await self.run_db(i, self.bot.db.users.set_digest(i.user.id, enabled))
+        digest_users = self.bot.cogs["AutoTask"].digest_users
+        if enabled:
+            digest_users.add(i.user.id)
+        else:
+            digest_users.discard(i.user.id)
+        embed = templates.digest_set(i.locale.value, enabled, i.user)
+        await self.respond(i, embed)
+
     @delete.autocomplete("event")
     async def delete_autocomplete_event(
         self, i: discord.Interaction, current: str
     ) -> List[app_commands.Choice[int]]:
-        events = await self.bot.db.events.get_all_of_user(i.user.id)
-        if current:
-            return [
-                app_commands.Choice(
-                    name=event.name,
-                    value=event.id,
-                )
-                for event in events
-                if current.lower() in event.name.lower()
-            ][:25]
-        else:
-            return [
-                app_commands.Choice(
-                    name=event.name,
-                    value=event.id,
-                )
-                for event in events
-            ][:25]
+        # only the events in the upcoming index are suggested, later ones can be
+        # deleted by typing their id, which /s list shows. Served from memory, it takes
+        # no tokens, which every keystroke would otherwise drain before the command
+        return self.filter_choices(
+            self.bot.db.upcoming.get_of_user(i.user.id), current
+        )
+
+    @staticmethod
+    def filter_choices(
+        events: List[Event], current: str
+    ) -> List[app_commands.Choice[int]]:
+        """
+        Build the autocomplete choices of the events whose name contains the current input.
+
+        Args:
+            events (List[Event]): The events to choose from.
+            current (str): The current input of the user.
+
+        Returns:
+            List[app_commands.Choice[int]]: At most 25 choices.
+        """
+        return [
+            app_commands.Choice(
+                name=event.name,
+                value=event.id,
+            )
+            for event in events
+            if current.lower() in event.name.lower()
+        ][:25]
 
 
 async def setup(bot: Bot) -> None:
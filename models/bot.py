@@ -6,6 +6,7 @@ from discord.enums import Locale
 from discord.ext import commands
 
 from i18n.translator import translator
+from models.clock import Clock
 from models.db.database import DataBase
 
 
@@ -15,9 +16,11 @@ class Bot(commands.Bot):
 
     Attributes:
         db (DataBase): The database.
+        clock (Clock): The clock the scheduler reads the time from and sleeps on.
     """
 
     db: DataBase
+    clock: Clock
     owner_ids: Tuple[int, ...]
 
 
@@ -32,6 +35,9 @@ class BotTranslator(app_commands.Translator):
         """
         Translate a string to the specified language.
 
+        Locales without a language file get no localization, instead of a copy of
+        the English one, which keeps the synced command payload small.
+
         Args:
             string (str): The string to translate.
             locale (Locale): The language to translate to.
@@ -40,6 +46,8 @@ class BotTranslator(app_commands.Translator):
         Returns:
             str: The translated string.
         """
+        if locale.value not in translator.lang_files:
+            return None
         try:
             return translator.translate(locale.value, string.extras["context"])
         except KeyError:
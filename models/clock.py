@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+from typing import List, Tuple
+
+from utils import get_dt_now
+
+
+class Clock:
+    """
+    The clock the scheduler reads the time from and sleeps on, the real one by default.
+    """
+
+    def now(self) -> datetime.datetime:
+        """
+        Get the current datetime with the timezone set to "Asia/Taipei".
+
+        Returns:
+            datetime.datetime: The current datetime.
+        """
+        return get_dt_now()
+
+    async def sleep(self, seconds: float) -> None:
+        """
+        Sleep for the given number of seconds.
+
+        Args:
+            seconds (float): The seconds to sleep, negative values return immediately.
+
+        Returns:
+            None
+        """
+        await asyncio.sleep(max(0.0, seconds))
+
+    async def sleep_until(self, when: datetime.datetime) -> None:
+        """
+        Sleep until the given datetime.
+
+        Args:
+            when (datetime.datetime): The datetime to wake up at.
+
+        Returns:
+            None
+        """
+        await self.sleep((when - self.now()).total_seconds())
+
+
+class SimulatedClock(Clock):
+    """
+    A clock whose time only moves when it is advanced.
+
+    Sleepers are woken in the order of their deadlines, each with the clock set to its
+    deadline, and the loop is given a few turns to settle before the next one is woken.
+    Work that waits on real I/O, such as a database query, only finishes while it
+    settles if it is given real time as well, through settle_delay. The memory backend
+    needs none and is the only one that keeps a simulation deterministic.
+
+    Attributes:
+        settle_rounds (int): How many turns the loop gets after each wakeup.
+        settle_delay (float): The real seconds waited after each wakeup, for real I/O.
+    """
+
+    def __init__(
+        self,
+        start: datetime.datetime,
+        settle_rounds: int = 20,
+        settle_delay: float = 0.0,
+    ) -> None:
+        self._now = start
+        self.settle_rounds = settle_rounds
+        self.settle_delay = settle_delay
+        self._sleepers: List[Tuple[datetime.datetime, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def now(self) -> datetime.datetime:
+        return self._now
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        deadline = self._now + datetime.timedelta(seconds=seconds)
+        heapq.heappush(self._sleepers, (deadline, next(self._counter), future))
+        # a cancelled sleeper leaves a done future behind, advance skips it
+        await future
+
+    async def settle(self) -> None:
+        """
+        Give the loop a few turns to run the tasks that are ready.
+
+        Returns:
+            None
+        """
+        for _ in range(self.settle_rounds):
+            await asyncio.sleep(0)
+        if self.settle_delay:
+            await asyncio.sleep(self.settle_delay)
+            for _ in range(self.settle_rounds):
+                await asyncio.sleep(0)
+
+    async def advance(self, delta: datetime.timedelta) -> int:
+        """
+        Move the clock forward, waking every sleeper whose deadline is passed on the way.
+
+        Args:
+            delta (datetime.timedelta): How far to move the clock.
+
+        Returns:
+            int: The number of sleepers woken.
+        """
+        end = self._now + delta
+        woken = 0
+        await self.settle()
+        while self._sleepers and self._sleepers[0][0] <= end:
+            deadline, _, future = heapq.heappop(self._sleepers)
+            if future.done():
+                continue
+            self._now = max(self._now, deadline)
+            future.set_result(None)
+            woken += 1
+            await self.settle()
+        self._now = end
+        return woken
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Set
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from ..tables.event import Event
+
+
+class DataBaseStats(BaseModel):
+    """
+    This class represents the size and fragmentation of the database.
+
+    Attributes:
+        size (int): The size of the database in bytes.
+        fragmentation (float): The ratio of unused space to all space.
+        events (int): The number of rows in the events table.
+        history (int): The number of rows in the event history table.
+    """
+
+    size: int
+    fragmentation: float
+    events: int
+    history: int
+
+
+class BaseEventTable(ABC):
+    """
+    This class is the interface of the events table.
+    """
+
+    @abstractmethod
+    async def create_table(self) -> None:
+        """
+        This method creates the events table if it does not exist.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def add(self, event: Event) -> int:
+        """
+        This method adds an event to the table.
+
+        Args:
+            event (Event): The event to add.
+
+        Returns:
+            int: The id of the added event.
+        """
+
+    @abstractmethod
+    async def get_all(self) -> List[Event]:
+        """
+        This method gets all the events in the table.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+
+    @abstractmethod
+    async def get(self, id: int) -> Optional[Event]:
+        """
+        This method gets the event with the given id.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            Optional[Event]: The event, or None if it does not exist.
+        """
+
+    @abstractmethod
+    async def get_between(
+        self, start: Optional[datetime], end: datetime
+    ) -> List[Event]:
+        """
+        This method gets the events whose first reminder is after start and until end,
+        ordered by the first reminder.
+
+        Args:
+            start (Optional[datetime]): The exclusive start, None for no lower bound.
+            end (datetime): The inclusive end.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+
+    @abstractmethod
+    async def get_all_of_user(self, user_id: int) -> List[Event]:
+        """
+        This method gets all the events of the given user, ordered by datetime.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+
+    @abstractmethod
+    async def update(self, id: int, **kwargs) -> bool:
+        """
+        This method updates the event with the given id.
+
+        Args:
+            id (int): The id of the event to update.
+            **kwargs: The fields of Event to update.
+
+        Returns:
+            bool: Whether the event exists, it may have been deleted meanwhile.
+        """
+
+    @abstractmethod
+    async def delete(self, id: int) -> None:
+        """
+        This method deletes the event with the given id.
+
+        Args:
+            id (int): The id of the event to delete.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+
+    @abstractmethod
+    async def count_of_user(self, user_id: int) -> int:
+        """
+        This method counts the events of the given user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of events.
+        """
+
+
+class BaseHistoryTable(ABC):
+    """
+    This class is the interface of the event history table.
+    """
+
+    @abstractmethod
+    async def create_table(self) -> None:
+        """
+        This method creates the event history table if it does not exist.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def archive(self, event: Event) -> None:
+        """
+        This method records a fired occurrence of an event.
+
+        One-off events are removed from the events table in the same transaction.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def prune(self, before: datetime) -> int:
+        """
+        This method deletes the history older than the given datetime.
+
+        Args:
+            before (datetime): The datetime to prune before.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+
+    @abstractmethod
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+
+
+class BaseUserTable(ABC):
+    """
+    This class is the interface of the user settings table.
+    """
+
+    @abstractmethod
+    async def create_table(self) -> None:
+        """
+        This method creates the user settings table if it does not exist.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def get_digest_users(self) -> Set[int]:
+        """
+        This method gets the users who opted in to digest mode.
+
+        Returns:
+            Set[int]: The ids of the users.
+        """
+
+    @abstractmethod
+    async def set_digest(self, user_id: int, enabled: bool) -> None:
+        """
+        This method opts a user in to or out of digest mode.
+
+        Args:
+            user_id (int): The id of the user.
+            enabled (bool): Whether digest mode is enabled.
+
+        Returns:
+            None
+        """
+
+
+class Backend(ABC):
+    """
+    This class is the interface of a storage backend.
+
+    Attributes:
+        events (BaseEventTable): The events table.
+        history (BaseHistoryTable): The event history table.
+        users (BaseUserTable): The user settings table.
+    """
+
+    events: BaseEventTable
+    history: BaseHistoryTable
+    users: BaseUserTable
+
+    @abstractmethod
+    async def start(self) -> None:
+        """
+        This method connects to the storage and creates the tables.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def optimize(self) -> None:
+        """
+        This method reclaims unused space and refreshes the query planner statistics.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    async def stats(self) -> DataBaseStats:
+        """
+        This method gets the size and fragmentation of the storage.
+
+        Returns:
+            DataBaseStats: The statistics of the storage.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        This method closes the connection to the storage.
+
+        Returns:
+            None
+        """
@@ -0,0 +1,307 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from ..tables.event import Event
+from .base import (
+    Backend,
+    BaseEventTable,
+    BaseHistoryTable,
+    BaseUserTable,
+    DataBaseStats,
+)
+
+
+class MemoryEventTable(BaseEventTable):
+    """
+    This class represents the events table in memory.
+
+    Events are copied on the way in and out, so callers can't mutate the stored rows.
+    """
+
+    def __init__(self) -> None:
+        self.rows: Dict[int, Event] = {}
+        self.next_id = 1
+
+    async def create_table(self) -> None:
+        """
+        This method does nothing, the table always exists.
+
+        Returns:
+            None
+        """
+
+    async def add(self, event: Event) -> int:
+        """
+        This method adds an event to the table.
+
+        Args:
+            event (Event): The event to add.
+
+        Returns:
+            int: The id of the added event.
+        """
+        id = self.next_id
+        self.next_id += 1
+        self.rows[id] = event.copy(update={"id": id})
+        return id
+
+    async def get_all(self) -> List[Event]:
+        """
+        This method gets all the events in the table.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        return [event.copy() for event in self.rows.values()]
+
+    async def get(self, id: int) -> Optional[Event]:
+        """
+        This method gets the event with the given id.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            Optional[Event]: The event, or None if it does not exist.
+        """
+        event = self.rows.get(id)
+        return event.copy() if event else None
+
+    async def get_between(
+        self, start: Optional[datetime], end: datetime
+    ) -> List[Event]:
+        """
+        This method gets the events whose first reminder is after start and until end,
+        ordered by the first reminder.
+
+        Args:
+            start (Optional[datetime]): The exclusive start, None for no lower bound.
+            end (datetime): The inclusive end.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        events = [
+            event.copy()
+            for event in self.rows.values()
+            if event.remind_at <= end and (start is None or event.remind_at > start)
+        ]
+        events.sort(key=lambda event: event.remind_at)
+        return events
+
+    async def get_all_of_user(self, user_id: int) -> List[Event]:
+        """
+        This method gets all the events of the given user, ordered by datetime.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        events = [
+            event.copy() for event in self.rows.values() if event.user_id == user_id
+        ]
+        events.sort(key=lambda event: event.when)
+        return events
+
+    async def update(self, id: int, **kwargs) -> bool:
+        """
+        This method updates the event with the given id.
+
+        Args:
+            id (int): The id of the event to update.
+            **kwargs: The fields of Event to update.
+
+        Returns:
+            bool: Whether the event exists, it may have been deleted meanwhile.
+        """
+        if id not in self.rows:
+            return False
+        self.rows[id] = self.rows[id].copy(update=kwargs)
+        return True
+
+    async def delete(self, id: int) -> None:
+        """
+        This method deletes the event with the given id.
+
+        Args:
+            id (int): The id of the event to delete.
+
+        Returns:
+            None
+        """
+        self.rows.pop(id, None)
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return len(self.rows)
+
+    async def count_of_user(self, user_id: int) -> int:
+        """
+        This method counts the events of the given user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of events.
+        """
+        return sum(1 for event in self.rows.values() if event.user_id == user_id)
+
+
+class MemoryHistoryTable(BaseHistoryTable):
+    """
+    This class represents the event history table in memory.
+    """
+
+    def __init__(self, events: MemoryEventTable) -> None:
+        self.events = events
+        self.rows: List[Event] = []
+
+    async def create_table(self) -> None:
+        """
+        This method does nothing, the table always exists.
+
+        Returns:
+            None
+        """
+
+    async def archive(self, event: Event) -> None:
+        """
+        This method records a fired occurrence of an event.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+        self.rows.append(event.copy())
+        if not event.recur:
+            await self.events.delete(event.id)
+
+    async def prune(self, before: datetime) -> int:
+        """
+        This method deletes the history older than the given datetime.
+
+        Args:
+            before (datetime): The datetime to prune before.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        count = len(self.rows)
+        self.rows = [event for event in self.rows if event.when >= before]
+        return count - len(self.rows)
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return len(self.rows)
+
+
+class MemoryUserTable(BaseUserTable):
+    """
+    This class represents the user settings table in memory.
+    """
+
+    def __init__(self) -> None:
+        self.digest_users: Set[int] = set()
+
+    async def create_table(self) -> None:
+        """
+        This method does nothing, the table always exists.
+
+        Returns:
+            None
+        """
+
+    async def get_digest_users(self) -> Set[int]:
+        """
+        This method gets the users who opted in to digest mode.
+
+        Returns:
+            Set[int]: The ids of the users.
+        """
+        return set(self.digest_users)
+
+    async def set_digest(self, user_id: int, enabled: bool) -> None:
+        """
+        This method opts a user in to or out of digest mode.
+
+        Args:
+            user_id (int): The id of the user.
+            enabled (bool): Whether digest mode is enabled.
+
+        Returns:
+            None
+        """
+        if enabled:
+            self.digest_users.add(user_id)
+        else:
+            self.digest_users.discard(user_id)
+
+
+class MemoryBackend(Backend):
+    """
+    This class stores the events in memory, for tests and benchmarks.
+
+    Nothing is persisted, the events are lost when the process exits.
+    """
+
+    events: MemoryEventTable
+    history: MemoryHistoryTable
+    users: MemoryUserTable
+
+    def __init__(self) -> None:
+        self.events = MemoryEventTable()
+        self.history = MemoryHistoryTable(self.events)
+        self.users = MemoryUserTable()
+
+    async def start(self) -> None:
+        """
+        This method does nothing, the tables are created with the backend.
+
+        Returns:
+            None
+        """
+
+    async def optimize(self) -> None:
+        """
+        This method does nothing, there is no unused space to reclaim.
+
+        Returns:
+            None
+        """
+
+    async def stats(self) -> DataBaseStats:
+        """
+        This method gets the row counts of the tables.
+
+        Returns:
+            DataBaseStats: The statistics of the storage, size is always 0.
+        """
+        return DataBaseStats(
+            size=0,
+            fragmentation=0.0,
+            events=await self.events.count(),
+            history=await self.history.count(),
+        )
+
+    async def close(self) -> None:
+        """
+        This method does nothing.
+
+        Returns:
+            None
+        """
@@ -0,0 +1,451 @@
+from datetime import datetime
+from typing import List, Optional, Set
+
+import asyncpg
+from pytz import timezone
+
+from ..tables.event import Event
+from .base import (
+    Backend,
+    BaseEventTable,
+    BaseHistoryTable,
+    BaseUserTable,
+    DataBaseStats,
+)
+
+
+def to_event(row: asyncpg.Record) -> Event:
+    """
+    This function converts a row of the events table to an Event.
+
+    Args:
+        row (asyncpg.Record): The row.
+
+    Returns:
+        Event: The event.
+    """
+    return Event(
+        id=row["id"],
+        user_id=row["user_id"],
+        name=row["name"],
+        when=row["datetime"].astimezone(timezone("Asia/Taipei")),
+        recur=row["recur"],
+        recur_interval=row["recur_interval"],
+        locale=row["locale"],
+        offsets=row["offsets"],
+    )
+
+
+class PostgresEventTable(BaseEventTable):
+    """
+    This class represents the events table in PostgreSQL.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    async def create_table(self) -> None:
+        """
+        This method creates the events table if it does not exist.
+
+        Returns:
+            None
+        """
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id BIGSERIAL PRIMARY KEY,
+                user_id BIGINT NOT NULL,
+                name TEXT NOT NULL,
+                datetime TIMESTAMPTZ NOT NULL,
+                recur BOOLEAN NOT NULL,
+                recur_interval INTEGER,
+                locale TEXT NOT NULL DEFAULT 'en-US'
+            );
+            ALTER TABLE events
+            ADD COLUMN IF NOT EXISTS offsets INTEGER[] NOT NULL DEFAULT '{}',
+            ADD COLUMN IF NOT EXISTS remind_at TIMESTAMPTZ;
+            UPDATE events SET remind_at = datetime WHERE remind_at IS NULL;
+            CREATE INDEX IF NOT EXISTS idx_events_user_id_datetime
+            ON events (user_id, datetime);
+            CREATE INDEX IF NOT EXISTS idx_events_remind_at
+            ON events (remind_at);
+            """
+        )
+
+    async def add(self, event: Event) -> int:
+        """
+        This method adds an event to the table.
+
+        Args:
+            event (Event): The event to add.
+
+        Returns:
+            int: The id of the added event.
+        """
+        return await self.pool.fetchval(
+            """
+            INSERT INTO events (
+                user_id, name, datetime, recur, recur_interval, locale, offsets, remind_at
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            RETURNING id
+            """,
+            event.user_id,
+            event.name,
+            event.when,
+            event.recur,
+            event.recur_interval.value if event.recur_interval else None,
+            event.locale,
+            event.offsets,
+            event.remind_at,
+        )
+
+    async def get_all(self) -> List[Event]:
+        """
+        This method gets all the events in the table.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        rows = await self.pool.fetch("SELECT * FROM events")
+        return [to_event(row) for row in rows]
+
+    async def get(self, id: int) -> Optional[Event]:
+        """
+        This method gets the event with the given id.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            Optional[Event]: The event, or None if it does not exist.
+        """
+        row = await self.pool.fetchrow("SELECT * FROM events WHERE id = $1", id)
+        return to_event(row) if row else None
+
+    async def get_between(
+        self, start: Optional[datetime], end: datetime
+    ) -> List[Event]:
+        """
+        This method gets the events whose first reminder is after start and until end,
+        ordered by the first reminder.
+
+        Args:
+            start (Optional[datetime]): The exclusive start, None for no lower bound.
+            end (datetime): The inclusive end.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        rows = await self.pool.fetch(
+            """
+            SELECT * FROM events
+            WHERE remind_at <= $1 AND ($2::timestamptz IS NULL OR remind_at > $2)
+            ORDER BY remind_at ASC
+            """,
+            end,
+            start,
+        )
+        return [to_event(row) for row in rows]
+
+    async def get_all_of_user(self, user_id: int) -> List[Event]:
+        """
+        This method gets all the events of the given user, ordered by datetime.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        rows = await self.pool.fetch(
+            """
+            SELECT * FROM events
+            WHERE user_id = $1
+            ORDER BY datetime ASC
+            """,
+            user_id,
+        )
+        return [to_event(row) for row in rows]
+
+    async def update(self, id: int, **kwargs) -> bool:
+        """
+        This method updates the event with the given id.
+
+        Args:
+            id (int): The id of the event to update.
+            **kwargs: The fields of Event to update.
+
+        Returns:
+            bool: Whether the event exists, it may have been deleted meanwhile.
+        """
+        if "when" in kwargs or "offsets" in kwargs:
+            event = await self.get(id)
+            if event is None:
+                return False
+            kwargs["remind_at"] = event.copy(update=kwargs).remind_at
+        columns = []
+        values = []
+        for key, value in kwargs.items():
+            if key == "when":
+                key = "datetime"
+            elif key == "recur_interval" and value is not None:
+                value = value.value
+            values.append(value)
+            columns.append(f"{key} = ${len(values)}")
+        status = await self.pool.execute(
+            f"UPDATE events SET {', '.join(columns)} WHERE id = ${len(values) + 1}",
+            *values,
+            id,
+        )
+        # the command tag, "UPDATE <rows>"
+        return status != "UPDATE 0"
+
+    async def delete(self, id: int) -> None:
+        """
+        This method deletes the event with the given id.
+
+        Args:
+            id (int): The id of the event to delete.
+
+        Returns:
+            None
+        """
+        await self.pool.execute("DELETE FROM events WHERE id = $1", id)
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return await self.pool.fetchval("SELECT COUNT(*) FROM events")
+
+    async def count_of_user(self, user_id: int) -> int:
+        """
+        This method counts the events of the given user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of events.
+        """
+        return await self.pool.fetchval(
+            "SELECT COUNT(*) FROM events WHERE user_id = $1", user_id
+        )
+
+
+class PostgresHistoryTable(BaseHistoryTable):
+    """
+    This class represents the event history table in PostgreSQL.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    async def create_table(self) -> None:
+        """
+        This method creates the event history table if it does not exist.
+
+        Returns:
+            None
+        """
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_history (
+                id BIGSERIAL PRIMARY KEY,
+                event_id BIGINT NOT NULL,
+                user_id BIGINT NOT NULL,
+                name TEXT NOT NULL,
+                datetime TIMESTAMPTZ NOT NULL,
+                recur_interval INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_event_history_datetime
+            ON event_history (datetime);
+            """
+        )
+
+    async def archive(self, event: Event) -> None:
+        """
+        This method records a fired occurrence of an event.
+
+        One-off events are removed from the events table in the same transaction.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    INSERT INTO event_history (event_id, user_id, name, datetime, recur_interval)
+                    VALUES ($1, $2, $3, $4, $5)
+                    """,
+                    event.id,
+                    event.user_id,
+                    event.name,
+                    event.when,
+                    event.recur_interval.value if event.recur_interval else None,
+                )
+                if not event.recur:
+                    await conn.execute("DELETE FROM events WHERE id = $1", event.id)
+
+    async def prune(self, before: datetime) -> int:
+        """
+        This method deletes the history older than the given datetime.
+
+        Args:
+            before (datetime): The datetime to prune before.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        status = await self.pool.execute(
+            "DELETE FROM event_history WHERE datetime < $1", before
+        )
+        # the status is in the form of "DELETE <count>"
+        return int(status.split()[-1])
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return await self.pool.fetchval("SELECT COUNT(*) FROM event_history")
+
+
+class PostgresUserTable(BaseUserTable):
+    """
+    This class represents the user settings table in PostgreSQL.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    async def create_table(self) -> None:
+        """
+        This method creates the user settings table if it does not exist.
+
+        Returns:
+            None
+        """
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id BIGINT PRIMARY KEY,
+                digest BOOLEAN NOT NULL DEFAULT FALSE
+            )
+            """
+        )
+
+    async def get_digest_users(self) -> Set[int]:
+        """
+        This method gets the users who opted in to digest mode.
+
+        Returns:
+            Set[int]: The ids of the users.
+        """
+        rows = await self.pool.fetch("SELECT id FROM users WHERE digest")
+        return {row["id"] for row in rows}
+
+    async def set_digest(self, user_id: int, enabled: bool) -> None:
+        """
+        This method opts a user in to or out of digest mode.
+
+        Args:
+            user_id (int): The id of the user.
+            enabled (bool): Whether digest mode is enabled.
+
+        Returns:
+            None
+        """
+        await self.pool.execute(
+            """
+            INSERT INTO users (id, digest) VALUES ($1, $2)
+            ON CONFLICT (id) DO UPDATE SET digest = excluded.digest
+            """,
+            user_id,
+            enabled,
+        )
+
+
+class PostgresBackend(Backend):
+    """
+    This class stores the events in PostgreSQL, so several bot processes can share them.
+
+    Attributes:
+        dsn (str): The connection string of the database.
+    """
+
+    pool: asyncpg.Pool
+    events: PostgresEventTable
+    history: PostgresHistoryTable
+    users: PostgresUserTable
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+
+    async def start(self) -> None:
+        """
+        This method creates the connection pool and the tables.
+
+        Returns:
+            None
+        """
+        self.pool = await asyncpg.create_pool(self.dsn)
+        self.events = PostgresEventTable(self.pool)
+        self.history = PostgresHistoryTable(self.pool)
+        self.users = PostgresUserTable(self.pool)
+        await self.events.create_table()
+        await self.history.create_table()
+        await self.users.create_table()
+
+    async def optimize(self) -> None:
+        """
+        This method runs VACUUM ANALYZE on the tables.
+
+        Returns:
+            None
+        """
+        await self.pool.execute("VACUUM (ANALYZE) events, event_history")
+
+    async def stats(self) -> DataBaseStats:
+        """
+        This method gets the size of the tables and their ratio of dead tuples.
+
+        Returns:
+            DataBaseStats: The statistics of the database.
+        """
+        size = await self.pool.fetchval(
+            "SELECT pg_total_relation_size('events') + pg_total_relation_size('event_history')"
+        )
+        fragmentation = await self.pool.fetchval(
+            """
+            SELECT COALESCE(SUM(n_dead_tup)::float / NULLIF(SUM(n_live_tup + n_dead_tup), 0), 0)
+            FROM pg_stat_user_tables
+            WHERE relname IN ('events', 'event_history')
+            """
+        )
+        return DataBaseStats(
+            size=size,
+            fragmentation=fragmentation,
+            events=await self.events.count(),
+            history=await self.history.count(),
+        )
+
+    async def close(self) -> None:
+        """
+        This method closes the connection pool.
+
+        Returns:
+            None
+        """
+        await self.pool.close()
@@ -0,0 +1,93 @@
+import aiosqlite
+
+from ..tables.event import EventTable
+from ..tables.history import HistoryTable
+from ..tables.user import UserTable
+from .base import Backend, DataBaseStats
+
+
+class SQLiteBackend(Backend):
+    """
+    This class stores the events in a single SQLite file.
+
+    Attributes:
+        path (str): The path of the database file.
+    """
+
+    conn: aiosqlite.Connection
+    events: EventTable
+    history: HistoryTable
+    users: UserTable
+
+    def __init__(self, path: str = "schedule_bot.db") -> None:
+        self.path = path
+
+    async def start(self) -> None:
+        """
+        This method connects to the database and creates the tables.
+
+        Returns:
+            None
+        """
+        self.conn = await aiosqlite.connect(self.path)
+        await self.enable_incremental_vacuum()
+        self.events = EventTable(self.conn)
+        self.history = HistoryTable(self.conn)
+        self.users = UserTable(self.conn)
+        await self.events.create_table()
+        await self.history.create_table()
+        await self.users.create_table()
+
+    async def enable_incremental_vacuum(self) -> None:
+        """
+        This method switches the database to incremental auto vacuum.
+
+        Existing databases need a full VACUUM once for the change to take effect.
+
+        Returns:
+            None
+        """
+        cursor = await self.conn.execute("PRAGMA auto_vacuum")
+        row = await cursor.fetchone()
+        if row[0] != 2:
+            await self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await self.conn.execute("VACUUM")
+
+    async def optimize(self) -> None:
+        """
+        This method returns the free pages to the file system and runs ANALYZE.
+
+        Returns:
+            None
+        """
+        # each step of the pragma frees one page, executescript runs it to completion
+        await self.conn.executescript("PRAGMA incremental_vacuum; ANALYZE;")
+
+    async def stats(self) -> DataBaseStats:
+        """
+        This method gets the size and fragmentation of the database file.
+
+        Returns:
+            DataBaseStats: The statistics of the database.
+        """
+        pragmas = {}
+        for pragma in ("page_size", "page_count", "freelist_count"):
+            cursor = await self.conn.execute(f"PRAGMA {pragma}")
+            row = await cursor.fetchone()
+            pragmas[pragma] = row[0]
+        page_count = pragmas["page_count"]
+        return DataBaseStats(
+            size=pragmas["page_size"] * page_count,
+            fragmentation=pragmas["freelist_count"] / page_count if page_count else 0.0,
+            events=await self.events.count(),
+            history=await self.history.count(),
+        )
+
+    async def close(self) -> None:
+        """
+        This method closes the database connection.
+
+        Returns:
+            None
+        """
+        await self.conn.close()
@@ -1,46 +1,129 @@
-import aiosqlite
+import os
+from datetime import datetime, timedelta
+from typing import Optional
 
-from .tables.event import EventTable
+from models.clock import Clock
+from models.limiter import PriorityGate
+
+from .backends.base import Backend, BaseUserTable, DataBaseStats
+from .upcoming import IndexedEventTable, IndexedHistoryTable, UpcomingIndex
 
 
 class DataBase:
     """
     This class represents the database.
+
+    The storage backend is chosen by the DATABASE_BACKEND environment variable:
+    "sqlite" (default, file set by DATABASE_PATH), "memory" or "postgres" (server set by DATABASE_URL).
+
+    Attributes:
+        backend (Backend): The storage backend.
+        clock (Clock): The clock the index and the maintenance read now from, the bot's.
+        gate (PriorityGate): Lets scheduler writes go ahead of interactive reads.
+        upcoming (UpcomingIndex): The in-memory index of upcoming events, loaded UPCOMING_HORIZON_HOURS ahead.
+        history_retention (timedelta): How long the event history is kept, set by the
+            HISTORY_RETENTION_DAYS environment variable.
     """
 
-    conn: aiosqlite.Connection
-    events: EventTable
+    events: IndexedEventTable
+    history: IndexedHistoryTable
+    users: BaseUserTable
+    upcoming: UpcomingIndex
+    history_retention: timedelta
+
+    def __init__(
+        self, backend: Optional[Backend] = None, clock: Optional[Clock] = None
+    ) -> None:
+        self.backend = backend
+        self.clock = clock or Clock()
+        self.gate = PriorityGate()
+
+    @staticmethod
+    def create_backend(
+        name: Optional[str] = None, path: Optional[str] = None
+    ) -> Backend:
+        """
+        This method creates the storage backend from the environment variables.
+
+        Args:
+            name (str, optional): The backend, defaults to DATABASE_BACKEND.
+            path (str, optional): The SQLite file, defaults to DATABASE_PATH.
+
+        Returns:
+            Backend: The storage backend.
+        """
+        name = name or os.getenv("DATABASE_BACKEND", "sqlite")
+        if name == "sqlite":
+            from .backends.sqlite import SQLiteBackend
+
+            return SQLiteBackend(path or os.getenv("DATABASE_PATH", "schedule_bot.db"))
+        if name == "memory":
+            from .backends.memory import MemoryBackend
+
+            return MemoryBackend()
+        if name == "postgres":
+            # asyncpg is only needed for this backend
+            from .backends.postgres import PostgresBackend
+
+            dsn = os.getenv("DATABASE_URL")
+            if dsn is None:
+                raise ValueError("DATABASE_URL environment variable not set")
+            return PostgresBackend(dsn)
+        raise ValueError(f"Invalid database backend: {name}")
 
     async def start(self) -> None:
         """
         This method starts the database.
 
-        This method connects to the database and creates the tables.
+        This method connects to the storage backend, creates the tables and loads the
+        upcoming index up to the horizon from the clock's now.
+
+        Raises:
+            ValueError: UPCOMING_HORIZON_HOURS is less than 12.
 
         Returns:
             None
         """
-        await self.connect()
-        self.events = EventTable(self.conn)
-        await self.create_tables()
+        self.history_retention = timedelta(
+            days=int(os.getenv("HISTORY_RETENTION_DAYS", "90"))
+        )
+        if self.backend is None:
+            self.backend = self.create_backend()
+        horizon = timedelta(hours=int(os.getenv("UPCOMING_HORIZON_HOURS", "24")))
+        # the scheduler loads the next 12 hours from the index
+        if horizon < timedelta(hours=12):
+            raise ValueError("UPCOMING_HORIZON_HOURS must be at least 12")
+        await self.backend.start()
+        self.upcoming = UpcomingIndex(self.backend.events, horizon, self.clock)
+        self.events = IndexedEventTable(self.backend.events, self.upcoming)
+        self.history = IndexedHistoryTable(self.backend.history, self.upcoming)
+        self.users = self.backend.users
+        await self.upcoming.refresh()
 
-    async def connect(self) -> None:
+    async def maintain(self, now: Optional[datetime] = None) -> int:
         """
-        This method connects to the database.
+        This method prunes the event history and reclaims unused space.
+
+        Args:
+            now (datetime, optional): The current datetime, defaults to the clock's.
 
         Returns:
-            None
+            int: The number of pruned history rows.
         """
-        self.conn = await aiosqlite.connect("schedule_bot.db")
+        pruned = await self.history.prune(
+            (now or self.clock.now()) - self.history_retention
+        )
+        await self.backend.optimize()
+        return pruned
 
-    async def create_tables(self) -> None:
+    async def stats(self) -> DataBaseStats:
         """
-        This method creates the tables.
+        This method gets the size and fragmentation of the database.
 
         Returns:
-            None
+            DataBaseStats: The statistics of the database.
         """
-        await self.events.create_table()
+        return await self.backend.stats()
 
     async def close(self) -> None:
         """
@@ -49,4 +132,4 @@ class DataBase:
         Returns:
             None
         """
-        await self.conn.close()
+        await self.backend.close()
@@ -1,11 +1,14 @@
-from datetime import datetime
+import calendar
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import aiosqlite
 from pydantic import BaseModel, validator
 from pytz import timezone
 
+from ..backends.base import BaseEventTable
+
 
 class RecurInterval(Enum):
     DAILY = 1
@@ -25,6 +28,8 @@ class Event(BaseModel):
         when (datetime): The date and time of the event.
         recur (bool): Whether or not the event recurs.
         recur_interval (RecurInterval, optional): The interval at which the event recurs.
+        locale (str): The locale of the user, used to translate the reminder.
+        offsets (List[int]): The minutes before the event to send advance reminders, largest first.
     """
 
     id: int = None
@@ -33,12 +38,16 @@ class Event(BaseModel):
     when: datetime
     recur: bool
     recur_interval: Optional[RecurInterval] = None
+    locale: str = "en-US"
+    offsets: List[int] = []
 
     @validator("when", pre=True)
     def convert_datetime(cls, v: str) -> datetime:
         """
         This validator converts the datetime string to a datetime object.
 
+        Datetimes are truncated to seconds, the precision they are stored with.
+
         Args:
             v (str): The datetime string.
 
@@ -46,15 +55,116 @@ class Event(BaseModel):
             datetime: The datetime object.
         """
         if isinstance(v, datetime):
-            return v
-        return datetime.strptime(v, "%Y-%m-%d %H:%M:%S").replace(
-            tzinfo=timezone("Asia/Taipei")
+            return v.replace(microsecond=0)
+        # localize instead of replace(tzinfo=...), which would use the +08:06 LMT offset
+        return timezone("Asia/Taipei").localize(
+            datetime.strptime(v, "%Y-%m-%d %H:%M:%S")
         )
 
+    @validator("offsets", pre=True)
+    def convert_offsets(cls, v) -> List[int]:
+        """
+        This validator converts the offsets to a sorted list without duplicates.
+
+        The offsets are stored as a comma separated string of minutes.
+
+        Args:
+            v (Union[str, List[int]]): The offsets.
+
+        Returns:
+            List[int]: The offsets, largest first.
+        """
+        if isinstance(v, str):
+            v = [int(offset) for offset in v.split(",") if offset]
+        return sorted({int(offset) for offset in v if int(offset) > 0}, reverse=True)
+
+    @property
+    def remind_at(self) -> datetime:
+        """
+        The datetime of the first reminder of the event.
+        """
+        if not self.offsets:
+            return self.when
+        return self.when - timedelta(minutes=self.offsets[0])
+
+    def fire_times(self) -> List[datetime]:
+        """
+        This method expands the offsets into the datetimes the reminders are sent at.
+
+        Returns:
+            List[datetime]: The datetimes in order, the last one is the event itself.
+        """
+        return [self.when - timedelta(minutes=offset) for offset in self.offsets] + [
+            self.when
+        ]
+
+    def next_when(self) -> datetime:
+        """
+        This method gets the datetime of the next occurrence of a recurring event.
+
+        A monthly or yearly event whose day is missing from the next month falls on the
+        last day of that month, and stays on that day afterwards.
+
+        Raises:
+            ValueError: The event has no valid recur interval.
+
+        Returns:
+            datetime: The datetime of the next occurrence.
+        """
+        if self.recur_interval is RecurInterval.DAILY:
+            return self.when + timedelta(days=1)
+        if self.recur_interval is RecurInterval.WEEKLY:
+            return self.when + timedelta(weeks=1)
+        if self.recur_interval is RecurInterval.MONTHLY:
+            months = 1
+        elif self.recur_interval is RecurInterval.YEARLY:
+            months = 12
+        else:
+            raise ValueError("Invalid recur interval")
+        year, month = divmod(self.when.month - 1 + months, 12)
+        year, month = self.when.year + year, month + 1
+        day = min(self.when.day, calendar.monthrange(year, month)[1])
+        return self.when.replace(year=year, month=month, day=day)
+
+
+def dump_offsets(offsets: List[int]) -> str:
+    """
+    This function converts the offsets of an event to the string stored in the database.
+
+    Args:
+        offsets (List[int]): The offsets in minutes.
+
+    Returns:
+        str: The comma separated offsets.
+    """
+    return ",".join(str(offset) for offset in offsets)
+
+
+def to_event(row: Tuple) -> Event:
+    """
+    This function converts a row of the events table to an Event.
+
+    Args:
+        row (Tuple): The row.
+
+    Returns:
+        Event: The event.
+    """
+    return Event(
+        id=row[0],
+        user_id=row[1],
+        name=row[2],
+        when=row[3],
+        recur=row[4],
+        recur_interval=row[5],
+        locale=row[6],
+        offsets=row[7],
+    )
+
 
-class EventTable:
+class EventTable(BaseEventTable):
     """
-    This class represents the events table.
+    This class represents the events table in SQLite.
     """
 
     def __init__(self, conn: aiosqlite.Connection) -> None:
@@ -75,13 +185,41 @@ class EventTable:
                 name TEXT NOT NULL,
                 datetime TEXT NOT NULL,
                 recur INTEGER NOT NULL,
-                recur_interval INTEGER
+                recur_interval INTEGER,
+                locale TEXT NOT NULL DEFAULT 'en-US',
+                offsets TEXT NOT NULL DEFAULT '',
+                remind_at TEXT
             )
             """
         )
+        cursor = await self.conn.execute("PRAGMA table_info(events)")
+        columns = [row[1] for row in await cursor.fetchall()]
+        if "locale" not in columns:
+            await self.conn.execute(
+                "ALTER TABLE events ADD COLUMN locale TEXT NOT NULL DEFAULT 'en-US'"
+            )
+        if "offsets" not in columns:
+            await self.conn.execute(
+                "ALTER TABLE events ADD COLUMN offsets TEXT NOT NULL DEFAULT ''"
+            )
+            # without offsets the first reminder is the event itself
+            await self.conn.execute("ALTER TABLE events ADD COLUMN remind_at TEXT")
+            await self.conn.execute("UPDATE events SET remind_at = datetime")
+        await self.conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_user_id_datetime
+            ON events (user_id, datetime)
+            """
+        )
+        await self.conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_events_remind_at
+            ON events (remind_at)
+            """
+        )
         await self.conn.commit()
 
-    async def add(self, event: Event) -> None:
+    async def add(self, event: Event) -> int:
         """
         This method adds an event to the table.
 
@@ -89,12 +227,14 @@ class EventTable:
             event (Event): The event to add.
 
         Returns:
-            None
+            int: The id of the added event.
         """
-        await self.conn.execute(
+        cursor = await self.conn.execute(
             """
-            INSERT INTO events (user_id, name, datetime, recur, recur_interval)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO events (
+                user_id, name, datetime, recur, recur_interval, locale, offsets, remind_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 event.user_id,
@@ -102,9 +242,13 @@ class EventTable:
                 event.when.strftime("%Y-%m-%d %H:%M:%S"),
                 int(event.recur),
                 event.recur_interval.value if event.recur_interval else None,
+                event.locale,
+                dump_offsets(event.offsets),
+                event.remind_at.strftime("%Y-%m-%d %H:%M:%S"),
             ),
         )
         await self.conn.commit()
+        return cursor.lastrowid
 
     async def get_all(self) -> List[Event]:
         """
@@ -115,22 +259,61 @@ class EventTable:
         """
         cursor = await self.conn.execute(
             """
-            SELECT id, user_id, name, datetime, recur, recur_interval
+            SELECT id, user_id, name, datetime, recur, recur_interval, locale, offsets
             FROM events
             """
         )
         rows = await cursor.fetchall()
-        return [
-            Event(
-                id=row[0],
-                user_id=row[1],
-                name=row[2],
-                when=row[3],
-                recur=row[4],
-                recur_interval=row[5],
-            )
-            for row in rows
-        ]
+        return [to_event(row) for row in rows]
+
+    async def get(self, id: int) -> Optional[Event]:
+        """
+        This method gets the event with the given id.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            Optional[Event]: The event, or None if it does not exist.
+        """
+        cursor = await self.conn.execute(
+            """
+            SELECT id, user_id, name, datetime, recur, recur_interval, locale, offsets
+            FROM events
+            WHERE id = ?
+            """,
+            (id,),
+        )
+        row = await cursor.fetchone()
+        return to_event(row) if row else None
+
+    async def get_between(
+        self, start: Optional[datetime], end: datetime
+    ) -> List[Event]:
+        """
+        This method gets the events whose first reminder is after start and until end,
+        ordered by the first reminder.
+
+        Args:
+            start (Optional[datetime]): The exclusive start, None for no lower bound.
+            end (datetime): The inclusive end.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        query = """
+            SELECT id, user_id, name, datetime, recur, recur_interval, locale, offsets
+            FROM events
+            WHERE remind_at <= ?
+            """
+        params = [end.strftime("%Y-%m-%d %H:%M:%S")]
+        if start is not None:
+            query += " AND remind_at > ?"
+            params.append(start.strftime("%Y-%m-%d %H:%M:%S"))
+        query += " ORDER BY remind_at ASC"
+        cursor = await self.conn.execute(query, params)
+        rows = await cursor.fetchall()
+        return [to_event(row) for row in rows]
 
     async def get_all_of_user(self, user_id: int) -> List[Event]:
         """
@@ -144,7 +327,7 @@ class EventTable:
         """
         cursor = await self.conn.execute(
             """
-            SELECT id, user_id, name, datetime, recur, recur_interval
+            SELECT id, user_id, name, datetime, recur, recur_interval, locale, offsets
             FROM events
             WHERE user_id = ?
             ORDER BY datetime ASC
@@ -152,36 +335,44 @@ class EventTable:
             (user_id,),
         )
         rows = await cursor.fetchall()
-        return [
-            Event(
-                id=row[0],
-                user_id=row[1],
-                name=row[2],
-                when=row[3],
-                recur=row[4],
-                recur_interval=row[5],
-            )
-            for row in rows
-        ]
+        return [to_event(row) for row in rows]
 
-    async def update(self, id: int, **kwargs) -> None:
+    async def update(self, id: int, **kwargs) -> bool:
         """
         This method updates the event with the given id.
 
         Args:
             id (int): The id of the event to update.
-            **kwargs: The fields to update.
+            **kwargs: The fields of Event to update.
 
         Returns:
-            None
+            bool: Whether the event exists, it may have been deleted meanwhile.
         """
-        query = "UPDATE events SET "
+        if "when" in kwargs or "offsets" in kwargs:
+            event = await self.get(id)
+            if event is None:
+                return False
+            kwargs["remind_at"] = event.copy(update=kwargs).remind_at
+        columns = []
+        values = []
         for key, value in kwargs.items():
-            query += f"{key} = {value}, "
-        query = query[:-2]
-        query += f" WHERE id = {id}"
-        await self.conn.execute(query)
+            if key == "when":
+                key, value = "datetime", value.strftime("%Y-%m-%d %H:%M:%S")
+            elif key == "remind_at":
+                value = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif key == "offsets":
+                value = dump_offsets(value)
+            elif isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, bool):
+                value = int(value)
+            columns.append(f"{key} = ?")
+            values.append(value)
+        cursor = await self.conn.execute(
+            f"UPDATE events SET {', '.join(columns)} WHERE id = ?", (*values, id)
+        )
         await self.conn.commit()
+        return cursor.rowcount > 0
 
     async def delete(self, id: int) -> None:
         """
@@ -201,3 +392,30 @@ class EventTable:
             (id,),
         )
         await self.conn.commit()
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        cursor = await self.conn.execute("SELECT COUNT(*) FROM events")
+        row = await cursor.fetchone()
+        return row[0]
+
+    async def count_of_user(self, user_id: int) -> int:
+        """
+        This method counts the events of the given user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            int: The number of events.
+        """
+        cursor = await self.conn.execute(
+            "SELECT COUNT(*) FROM events WHERE user_id = ?", (user_id,)
+        )
+        row = await cursor.fetchone()
+        return row[0]
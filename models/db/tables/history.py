@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import aiosqlite
+
+from ..backends.base import BaseHistoryTable
+from .event import Event
+
+
+class HistoryTable(BaseHistoryTable):
+    """
+    This class represents the event history table in SQLite.
+
+    Every fired occurrence of an event is recorded here, so one-off events can be
+    removed from the events table without losing their history.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection) -> None:
+        self.conn = conn
+
+    async def create_table(self) -> None:
+        """
+        This method creates the event history table if it does not exist.
+
+        Returns:
+            None
+        """
+        await self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                datetime TEXT NOT NULL,
+                recur_interval INTEGER
+            )
+            """
+        )
+        await self.conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_event_history_datetime
+            ON event_history (datetime)
+            """
+        )
+        await self.conn.commit()
+
+    async def archive(self, event: Event) -> None:
+        """
+        This method records a fired occurrence of an event.
+
+        One-off events are removed from the events table in the same transaction,
+        recurring events are left for the scheduler to move to their next occurrence.
+
+        Args:
+            event (Event): The event that fired.
+
+        Returns:
+            None
+        """
+        await self.conn.execute(
+            """
+            INSERT INTO event_history (event_id, user_id, name, datetime, recur_interval)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                event.id,
+                event.user_id,
+                event.name,
+                event.when.strftime("%Y-%m-%d %H:%M:%S"),
+                event.recur_interval.value if event.recur_interval else None,
+            ),
+        )
+        if not event.recur:
+            await self.conn.execute(
+                """
+                DELETE FROM events
+                WHERE id = ?
+                """,
+                (event.id,),
+            )
+        await self.conn.commit()
+
+    async def prune(self, before: datetime) -> int:
+        """
+        This method deletes the history older than the given datetime.
+
+        Args:
+            before (datetime): The datetime to prune before.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        cursor = await self.conn.execute(
+            """
+            DELETE FROM event_history
+            WHERE datetime < ?
+            """,
+            (before.strftime("%Y-%m-%d %H:%M:%S"),),
+        )
+        await self.conn.commit()
+        return cursor.rowcount
+
+    async def count(self) -> int:
+        """
+        This method counts the rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        cursor = await self.conn.execute("SELECT COUNT(*) FROM event_history")
+        row = await cursor.fetchone()
+        return row[0]
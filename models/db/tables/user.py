@@ -0,0 +1,62 @@
+from typing import Set
+
+import aiosqlite
+
+from ..backends.base import BaseUserTable
+
+
+class UserTable(BaseUserTable):
+    """
+    This class represents the user settings table in SQLite.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection) -> None:
+        self.conn = conn
+
+    async def create_table(self) -> None:
+        """
+        This method creates the user settings table if it does not exist.
+
+        Returns:
+            None
+        """
+        await self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                digest INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        await self.conn.commit()
+
+    async def get_digest_users(self) -> Set[int]:
+        """
+        This method gets the users who opted in to digest mode.
+
+        Returns:
+            Set[int]: The ids of the users.
+        """
+        cursor = await self.conn.execute("SELECT id FROM users WHERE digest = 1")
+        rows = await cursor.fetchall()
+        return {row[0] for row in rows}
+
+    async def set_digest(self, user_id: int, enabled: bool) -> None:
+        """
+        This method opts a user in to or out of digest mode.
+
+        Args:
+            user_id (int): The id of the user.
+            enabled (bool): Whether digest mode is enabled.
+
+        Returns:
+            None
+        """
+        await self.conn.execute(
+            """
+            INSERT INTO users (id, digest) VALUES (?, ?)
+            ON CONFLICT (id) DO UPDATE SET digest = excluded.digest
+            """,
+            (user_id, int(enabled)),
+        )
+        await self.conn.commit()
@@ -0,0 +1,295 @@
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models.clock import Clock
+
+from .backends.base import BaseEventTable, BaseHistoryTable
+from .tables.event import Event
+
+Key = Tuple[datetime, int]
+
+
+class UpcomingIndex:
+    """
+    An in-memory index of the events whose first reminder is within the horizon.
+
+    The events are kept sorted by their first reminder, with secondary indexes by id and
+    by user, the latter sorted by datetime. The index covers every event whose first
+    reminder is up to `loaded_until`, including overdue ones that are still in the
+    database, so a query that stays inside the covered range doesn't need the database.
+
+    Attributes:
+        table (BaseEventTable): The events table the index mirrors.
+        horizon (timedelta): How far ahead of now the index is loaded.
+        clock (Clock): The clock now is read from.
+        loaded_until (datetime, optional): The end of the covered range, None before the first load.
+    """
+
+    def __init__(self, table: BaseEventTable, horizon: timedelta, clock: Clock) -> None:
+        self.table = table
+        self.horizon = horizon
+        self.clock = clock
+        self.loaded_until: Optional[datetime] = None
+        self._sorted: List[Key] = []
+        self._by_id: Dict[int, Event] = {}
+        self._by_user: Dict[int, List[Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def covers(self, when: datetime) -> bool:
+        """
+        Check whether a datetime is inside the covered range.
+
+        Args:
+            when (datetime): The datetime, the first reminder of an event decides whether it belongs in the index.
+
+        Returns:
+            bool: Whether the datetime is inside the covered range.
+        """
+        return self.loaded_until is not None and when <= self.loaded_until
+
+    def _insert(self, event: Event) -> None:
+        self._by_id[event.id] = event
+        insort(self._sorted, (event.remind_at, event.id))
+        insort(self._by_user.setdefault(event.user_id, []), (event.when, event.id))
+
+    @staticmethod
+    def _discard(keys: List[Key], key: Key) -> None:
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+
+    def add(self, event: Event) -> None:
+        """
+        Add an event to the index if it is inside the covered range.
+
+        Args:
+            event (Event): The event to add, it must have an id.
+
+        Returns:
+            None
+        """
+        self.remove(event.id)
+        if self.covers(event.remind_at):
+            self._insert(event.copy())
+
+    def remove(self, id: int) -> None:
+        """
+        Remove an event from the index.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            None
+        """
+        event = self._by_id.pop(id, None)
+        if event is None:
+            return
+        self._discard(self._sorted, (event.remind_at, event.id))
+        keys = self._by_user[event.user_id]
+        self._discard(keys, (event.when, event.id))
+        if not keys:
+            del self._by_user[event.user_id]
+
+    def update(self, id: int, **kwargs) -> bool:
+        """
+        Update an event in the index.
+
+        Args:
+            id (int): The id of the event.
+            **kwargs: The fields of Event to update.
+
+        Returns:
+            bool: Whether the event was in the index.
+        """
+        event = self._by_id.get(id)
+        if event is None:
+            return False
+        self.add(event.copy(update=kwargs))
+        return True
+
+    def get(self, id: int) -> Optional[Event]:
+        """
+        Get an event by id.
+
+        Args:
+            id (int): The id of the event.
+
+        Returns:
+            Optional[Event]: The event, or None if it isn't in the index.
+        """
+        event = self._by_id.get(id)
+        return event.copy() if event else None
+
+    def get_until(self, end: datetime) -> List[Event]:
+        """
+        Get the events whose first reminder is until the given datetime, ordered by
+        the first reminder.
+
+        Args:
+            end (datetime): The inclusive end.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        events = []
+        for remind_at, id in self._sorted:
+            if remind_at > end:
+                break
+            events.append(self._by_id[id].copy())
+        return events
+
+    def get_of_user(self, user_id: int) -> List[Event]:
+        """
+        Get the indexed events of a user up to `loaded_until`, ordered by datetime.
+
+        Events after `loaded_until` that are indexed because of an advance reminder are
+        left out, the user may have other events before them that aren't indexed.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Returns:
+            List[Event]: The list of events.
+        """
+        events = []
+        for when, id in self._by_user.get(user_id, []):
+            if not self.covers(when):
+                break
+            events.append(self._by_id[id].copy())
+        return events
+
+    async def refresh(self, now: Optional[datetime] = None) -> int:
+        """
+        Extend the covered range to now + horizon, loading only the events not loaded yet.
+
+        Args:
+            now (datetime, optional): The current datetime, defaults to the clock's.
+
+        Returns:
+            int: The number of loaded events.
+        """
+        if self.loaded_until is None:
+            await self.reconcile(now)
+            return len(self)
+
+        end = (now or self.clock.now()) + self.horizon
+        if end <= self.loaded_until:
+            return 0
+        events = await self.table.get_between(self.loaded_until, end)
+        self.loaded_until = end
+        for event in events:
+            self.add(event)
+        return len(events)
+
+    async def reconcile(self, now: Optional[datetime] = None) -> int:
+        """
+        Reload the covered range from the database, fixing any drift.
+
+        Args:
+            now (datetime, optional): The current datetime, defaults to the clock's.
+
+        Returns:
+            int: The number of events that differed from the database.
+        """
+        end = (now or self.clock.now()) + self.horizon
+        events = await self.table.get_between(None, end)
+        fresh = {event.id: event for event in events}
+        # events between the old and the new end are new to the index, not drift
+        drift = sum(1 for id in self._by_id if id not in fresh) + sum(
+            1
+            for id, event in fresh.items()
+            if self.covers(event.remind_at) and self._by_id.get(id) != event
+        )
+
+        self.loaded_until = end
+        self._sorted = []
+        self._by_id = {}
+        self._by_user = {}
+        for event in events:
+            self._insert(event)
+        if drift:
+            logging.warning(f"[UpcomingIndex]Reconciled {drift} drifted events")
+        return drift
+
+
+class IndexedEventTable(BaseEventTable):
+    """
+    The events table of a backend, with every write mirrored to the upcoming index.
+    """
+
+    def __init__(self, table: BaseEventTable, index: UpcomingIndex) -> None:
+        self.table = table
+        self.index = index
+
+    async def create_table(self) -> None:
+        await self.table.create_table()
+
+    async def add(self, event: Event) -> int:
+        id = await self.table.add(event)
+        self.index.add(event.copy(update={"id": id}))
+        return id
+
+    async def get(self, id: int) -> Optional[Event]:
+        return self.index.get(id) or await self.table.get(id)
+
+    async def get_all(self) -> List[Event]:
+        return await self.table.get_all()
+
+    async def get_between(
+        self, start: Optional[datetime], end: datetime
+    ) -> List[Event]:
+        return await self.table.get_between(start, end)
+
+    async def get_all_of_user(self, user_id: int) -> List[Event]:
+        return await self.table.get_all_of_user(user_id)
+
+    async def update(self, id: int, **kwargs) -> bool:
+        if not await self.table.update(id, **kwargs):
+            return False
+        if self.index.update(id, **kwargs):
+            return True
+        if "when" in kwargs or "offsets" in kwargs:
+            # may have moved into the covered range, the index needs the whole row
+            event = await self.table.get(id)
+            if event is not None:
+                self.index.add(event)
+        return True
+
+    async def delete(self, id: int) -> None:
+        await self.table.delete(id)
+        self.index.remove(id)
+
+    async def count(self) -> int:
+        return await self.table.count()
+
+    async def count_of_user(self, user_id: int) -> int:
+        return await self.table.count_of_user(user_id)
+
+
+class IndexedHistoryTable(BaseHistoryTable):
+    """
+    The event history table of a backend, removing archived one-off events from the upcoming index.
+    """
+
+    def __init__(self, table: BaseHistoryTable, index: UpcomingIndex) -> None:
+        self.table = table
+        self.index = index
+
+    async def create_table(self) -> None:
+        await self.table.create_table()
+
+    async def archive(self, event: Event) -> None:
+        await self.table.archive(event)
+        if not event.recur:
+            self.index.remove(event.id)
+
+    async def prune(self, before: datetime) -> int:
+        return await self.table.prune(before)
+
+    async def count(self) -> int:
+        return await self.table.count()
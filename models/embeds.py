@@ -1,5 +1,19 @@
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+import discord
 from discord import Embed
 
+from i18n.translator import translator
+from models.db.tables.event import Event
+from utils import MAX_OFFSET, MAX_OFFSETS, format_offset
+
+# the limits Discord puts on embeds
+FIELD_NAME_LIMIT = 256
+FIELDS_PER_EMBED = 25
+EMBEDS_PER_MESSAGE = 10
+CHARACTERS_PER_MESSAGE = 6000
+
 
 class DefaultEmbed(Embed):
     """
@@ -10,4 +24,388 @@ class DefaultEmbed(Embed):
     """
 
     def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs, color=0xF1DCE5)
\ No newline at end of file
+        super().__init__(*args, **kwargs, color=0xF1DCE5)
+
+
+class EmbedTemplates:
+    """
+    Per-locale embed templates for command responses.
+
+    The static, translated parts of each response (title, field names, footers) are
+    rendered once per locale into a skeleton, rendering a response only fills in the
+    dynamic values.
+    """
+
+    def __init__(self) -> None:
+        self._skeletons: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._strings: Dict[Tuple[str, str], str] = {}
+
+    def clear(self) -> None:
+        """
+        Clear all cached skeletons and strings, e.g. after the language files are reloaded.
+
+        Returns:
+            None
+        """
+        self._skeletons.clear()
+        self._strings.clear()
+
+    def _translate(self, lang: str, context: str) -> str:
+        """
+        Translate a string, caching the result.
+
+        Args:
+            lang (str): The language to translate to.
+            context (str): The context of the string.
+
+        Returns:
+            str: The translated string.
+        """
+        key = (lang, context)
+        try:
+            return self._strings[key]
+        except KeyError:
+            value = self._strings[key] = translator.translate(lang, context)
+            return value
+
+    def _skeleton(self, kind: str, lang: str) -> Dict[str, Any]:
+        """
+        Get the skeleton of a response type, building it on first use.
+
+        Args:
+            kind (str): The response type.
+            lang (str): The language of the skeleton.
+
+        Returns:
+            Dict[str, Any]: The skeleton in the embed dict format.
+        """
+        key = (kind, lang)
+        try:
+            return self._skeletons[key]
+        except KeyError:
+            pass
+
+        embed = DefaultEmbed()
+        if kind == "add":
+            embed.title = self._translate(lang, "commands.add.embed.title")
+            for field in ("name", "when", "recur", "recur_interval"):
+                embed.add_field(
+                    name=self._translate(
+                        lang, f"commands.add.embed.fields.{field}.name"
+                    ),
+                    value="",
+                    inline=False,
+                )
+        elif kind == "list":
+            embed.title = self._translate(lang, "commands.list.embed.title")
+        elif kind == "delete":
+            embed.title = self._translate(lang, "commands.delete.embed.title")
+            embed.set_footer(
+                text=self._translate(lang, "commands.delete.embed.footer")
+            )
+        elif kind == "upcoming":
+            embed.title = self._translate(lang, "event_upcoming.embed.title")
+            embed.add_field(
+                name=self._translate(lang, "event_upcoming.embed.fields.when.name"),
+                value="",
+                inline=False,
+            )
+        elif kind == "digest":
+            embed.title = self._translate(lang, "event_digest.embed.title")
+        elif kind == "digest_set":
+            embed.title = self._translate(lang, "commands.digest.embed.title")
+        elif kind == "rate_limited":
+            embed.title = self._translate(lang, "errors.rate_limited.title")
+        elif kind == "command_failed":
+            embed.title = self._translate(lang, "errors.command_failed.title")
+            embed.description = self._translate(
+                lang, "errors.command_failed.description"
+            )
+        elif kind == "invalid_offsets":
+            embed.title = self._translate(lang, "errors.invalid_offsets.title")
+        else:
+            raise ValueError(f"Invalid embed kind: {kind}")
+
+        skeleton = self._skeletons[key] = embed.to_dict()
+        return skeleton
+
+    def _render(
+        self, kind: str, lang: str, values: Sequence[str] = ()
+    ) -> DefaultEmbed:
+        """
+        Render a new embed from a skeleton.
+
+        Args:
+            kind (str): The response type.
+            lang (str): The language of the embed.
+            values (Sequence[str]): The values of the skeleton's fields, fields without a value are dropped.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        skeleton = self._skeleton(kind, lang)
+        if "fields" not in skeleton:
+            # from_dict costs more than the few translations such a skeleton saves
+            embed = DefaultEmbed(
+                title=skeleton.get("title"), description=skeleton.get("description")
+            )
+            if "footer" in skeleton:
+                embed.set_footer(text=skeleton["footer"]["text"])
+            return embed
+
+        data = dict(skeleton)
+        data["fields"] = [
+            {**field, "value": value}
+            for field, value in zip(skeleton["fields"], values)
+        ]
+        return DefaultEmbed.from_dict(data)
+
+    def event_added(
+        self, lang: str, event: Event, user: discord.abc.User
+    ) -> DefaultEmbed:
+        """
+        Render the response of the add command.
+
+        Args:
+            lang (str): The language of the embed.
+            event (Event): The event that was added.
+            user (discord.abc.User): The user who added the event.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        values = [
+            event.name,
+            f"{discord.utils.format_dt(event.when)}/{discord.utils.format_dt(event.when, 'R')}",
+            self._translate(
+                lang,
+                f"commands.add.embed.fields.recur.values.{'yes' if event.recur else 'no'}",
+            ),
+        ]
+        if event.recur_interval:
+            values.append(
+                self._translate(
+                    lang,
+                    f"commands.add.embed.fields.recur_interval.values.{event.recur_interval.value}",
+                )
+            )
+        embed = self._render("add", lang, values)
+        if event.offsets:
+            embed.add_field(
+                name=self._translate(lang, "commands.add.embed.fields.remind_before.name"),
+                value=", ".join(format_offset(offset) for offset in event.offsets),
+                inline=False,
+            )
+        embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+        return embed
+
+    def event_list(
+        self, lang: str, events: List[Event], total: int, user: discord.abc.User
+    ) -> DefaultEmbed:
+        """
+        Render the response of the list command.
+
+        Args:
+            lang (str): The language of the embed.
+            events (List[Event]): The events to show.
+            total (int): The total number of events of the user.
+            user (discord.abc.User): The user who owns the events.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render("list", lang)
+        for event in events:
+            embed.add_field(
+                name=event.name,
+                value=f"- {discord.utils.format_dt(event.when)} ({discord.utils.format_dt(event.when, 'R')})\n- ID: {event.id}",
+                inline=False,
+            )
+        embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+        embed.set_footer(
+            text=self._translate(lang, "commands.list.embed.footer").format(
+                total=total
+            )
+        )
+        return embed
+
+    def event_deleted(self, lang: str, user: discord.abc.User) -> DefaultEmbed:
+        """
+        Render the response of the delete command.
+
+        Args:
+            lang (str): The language of the embed.
+            user (discord.abc.User): The user who deleted the event.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render("delete", lang)
+        embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+        return embed
+
+    def event_reminder(self, lang: str, event: Event) -> DefaultEmbed:
+        """
+        Render the reminder sent to the user when an event happens.
+
+        Args:
+            lang (str): The language of the embed.
+            event (Event): The event to remind the user about.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        # the hot path, built from the cached strings without a skeleton
+        embed = DefaultEmbed(
+            title=self._translate(lang, "event_reminder.embed.title"),
+            description=event.name,
+        )
+        if event.recur:
+            embed.set_footer(
+                text=f" ({self._translate(lang, 'event_reminder.embed.recurring')})"
+            )
+        return embed
+
+    def event_upcoming(self, lang: str, event: Event) -> DefaultEmbed:
+        """
+        Render the advance reminder sent to the user before an event happens.
+
+        Args:
+            lang (str): The language of the embed.
+            event (Event): The event to remind the user about.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render(
+            "upcoming",
+            lang,
+            (
+                f"{discord.utils.format_dt(event.when)}/{discord.utils.format_dt(event.when, 'R')}",
+            ),
+        )
+        embed.description = event.name
+        return embed
+
+    def event_digest(self, lang: str, events: List[Event]) -> List[DefaultEmbed]:
+        """
+        Render the digest sent to a user when several of their events happen together.
+
+        Args:
+            lang (str): The language of the embeds.
+            events (List[Event]): The events to remind the user about.
+
+        Returns:
+            List[DefaultEmbed]: The rendered embeds, each within the limits of a message.
+        """
+        recurring = self._translate(lang, "event_reminder.embed.recurring")
+        embeds = [self._render("digest", lang)]
+        for event in events:
+            name = event.name
+            if len(name) > FIELD_NAME_LIMIT:
+                name = name[: FIELD_NAME_LIMIT - 1] + "…"
+            value = discord.utils.format_dt(event.when, "t")
+            if event.recur:
+                value += f" ({recurring})"
+            embed = embeds[-1]
+            if (
+                len(embed.fields) == FIELDS_PER_EMBED
+                or len(embed) + len(name) + len(value) > CHARACTERS_PER_MESSAGE
+            ):
+                embed = self._render("digest", lang)
+                embeds.append(embed)
+            embed.add_field(name=name, value=value, inline=False)
+        return embeds
+
+    def digest_set(self, lang: str, enabled: bool, user: discord.abc.User) -> DefaultEmbed:
+        """
+        Render the response of the digest command.
+
+        Args:
+            lang (str): The language of the embed.
+            enabled (bool): Whether digest mode was enabled.
+            user (discord.abc.User): The user who ran the command.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render("digest_set", lang)
+        embed.description = self._translate(
+            lang,
+            f"commands.digest.embed.description.{'enabled' if enabled else 'disabled'}",
+        )
+        embed.set_author(name=user.display_name, icon_url=user.display_avatar.url)
+        return embed
+
+    def rate_limited(self, lang: str, retry_after: float) -> DefaultEmbed:
+        """
+        Render the error sent when a user runs commands too fast.
+
+        Args:
+            lang (str): The language of the embed.
+            retry_after (float): The seconds until the user can run a command again.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render("rate_limited", lang)
+        embed.description = self._translate(
+            lang, "errors.rate_limited.description"
+        ).format(retry_after=math.ceil(retry_after))
+        return embed
+
+    def invalid_offsets(self, lang: str) -> DefaultEmbed:
+        """
+        Render the error sent when the lead times of advance reminders can't be parsed.
+
+        Args:
+            lang (str): The language of the embed.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        embed = self._render("invalid_offsets", lang)
+        embed.description = self._translate(
+            lang, "errors.invalid_offsets.description"
+        ).format(max_offsets=MAX_OFFSETS, max_offset=format_offset(MAX_OFFSET))
+        return embed
+
+    def command_failed(self, lang: str) -> DefaultEmbed:
+        """
+        Render the error sent when a command fails unexpectedly.
+
+        Args:
+            lang (str): The language of the embed.
+
+        Returns:
+            DefaultEmbed: The rendered embed.
+        """
+        return self._render("command_failed", lang)
+
+
+def group_embeds(embeds: Sequence[Embed]) -> List[List[Embed]]:
+    """
+    Group embeds into as few messages as the limits of a message allow.
+
+    Args:
+        embeds (Sequence[Embed]): The embeds, each within the limits of a message.
+
+    Returns:
+        List[List[Embed]]: The embeds of each message.
+    """
+    messages: List[List[Embed]] = []
+    size = 0
+    for embed in embeds:
+        if (
+            not messages
+            or len(messages[-1]) == EMBEDS_PER_MESSAGE
+            or size + len(embed) > CHARACTERS_PER_MESSAGE
+        ):
+            messages.append([])
+            size = 0
+        messages[-1].append(embed)
+        size += len(embed)
+    return messages
+
+
+templates = EmbedTemplates()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from discord import app_commands
+
+
+class RateLimited(app_commands.CheckFailure):
+    """
+    Raised when a user runs commands faster than their token bucket allows.
+
+    Attributes:
+        retry_after (float): The seconds until the next token is available.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = retry_after
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+
+
+class TokenBucket:
+    """
+    A token bucket that refills `rate` tokens per second, up to `capacity` tokens.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """
+        Add the tokens accumulated since the last refill.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            None
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        self.refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class CommandLimiter:
+    """
+    Limits how fast each user can run commands and how many commands run at once.
+
+    Attributes:
+        rate (float): The tokens each user gets per second.
+        capacity (int): The burst size of each user.
+        in_flight (asyncio.Semaphore): The cap on commands doing database work at once.
+    """
+
+    def __init__(self, rate: float, capacity: int, max_in_flight: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self._buckets: Dict[int, TokenBucket] = {}
+
+    def check(self, user_id: int) -> None:
+        """
+        Take a token from the bucket of a user.
+
+        Args:
+            user_id (int): The id of the user.
+
+        Raises:
+            RateLimited: The user's bucket is empty.
+
+        Returns:
+            None
+        """
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= 1024:
+                self._prune()
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.capacity)
+        retry_after = bucket.try_acquire()
+        if retry_after:
+            raise RateLimited(retry_after)
+
+    def _prune(self) -> None:
+        """
+        Drop the buckets that have refilled, they are the same as new ones.
+
+        Returns:
+            None
+        """
+        now = time.monotonic()
+        for user_id, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._buckets[user_id]
+
+
+class PriorityGate:
+    """
+    Lets scheduler writes to the database go ahead of interactive reads.
+
+    Reads wait at the gate while any priority work is pending, so a burst of
+    commands can't queue up in front of a reminder on the shared connection.
+    """
+
+    def __init__(self) -> None:
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def priority(self) -> AsyncIterator[None]:
+        """
+        Hold the gate closed for the duration of the block.
+
+        Returns:
+            AsyncIterator[None]: The context manager.
+        """
+        self._pending += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.set()
+
+    async def wait(self) -> None:
+        """
+        Wait until no priority work is pending.
+
+        Returns:
+            None
+        """
+        await self._idle.wait()
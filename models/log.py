@@ -0,0 +1,108 @@
+import copy
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict
+
+# the attributes passed with `extra` that are copied to the JSON lines
+EXTRA_FIELDS = ("event_id", "user_id", "latency")
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as JSON lines.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a log record as a JSON object on a single line.
+
+        Args:
+            record (logging.LogRecord): The record to format.
+
+        Returns:
+            str: The JSON line.
+        """
+        data: Dict[str, Any] = {
+            "time": self.formatTime(record, "%y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        # records from the queue carry the traceback already formatted
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self.formatException(record.exc_info)
+        if exc_text:
+            data["exc_info"] = exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    A QueueHandler that keeps the traceback out of the message.
+
+    QueueHandler.prepare formats the traceback into the message and clears exc_info,
+    because tracebacks can't cross a queue. This handler formats it into exc_text
+    instead, where the listener's formatters look for it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepare a record for the queue.
+
+        Args:
+            record (logging.LogRecord): The record to prepare.
+
+        Returns:
+            logging.LogRecord: A copy with the message merged and the traceback formatted.
+        """
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def setup_logging(
+    filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5
+) -> QueueListener:
+    """
+    Route the root logger through a queue to a background thread.
+
+    The thread writes JSON lines to a rotating file and plain lines to the console,
+    so logging on the event loop only puts the record on the queue.
+
+    Args:
+        filename (str): The log file.
+        max_bytes (int): The size at which the log file is rotated.
+        backup_count (int): How many rotated files are kept.
+
+    Returns:
+        QueueListener: The started listener, stop it on shutdown to flush the queue.
+    """
+    file = RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file.setFormatter(JSONFormatter())
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(levelname)s %(name)s %(message)s"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LogQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, file, console, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from discord import app_commands
+from discord.abc import Snowflake
+from discord.ext import commands
+from pydantic import BaseModel
+
+
+class SyncReport(BaseModel):
+    """
+    The result of a command tree sync.
+
+    Attributes:
+        scope (str): "global" or the id of the guild.
+        mode (str): "skipped" when nothing changed, "narrow" when only the changed
+            commands were uploaded, "bulk" when the whole tree was.
+        added (List[str]): The commands that are new.
+        changed (List[str]): The commands whose payload changed.
+        removed (List[str]): The commands that no longer exist.
+        timings (Dict[str, float]): The seconds each phase took.
+    """
+
+    scope: str
+    mode: str
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    timings: Dict[str, float]
+
+
+def command_key(payload: Dict[str, Any]) -> str:
+    """
+    This function gets the key of a command, its name, with the type for context menus.
+
+    Args:
+        payload (Dict[str, Any]): The payload of the command.
+
+    Returns:
+        str: The key of the command.
+    """
+    type = payload.get("type", 1)
+    return payload["name"] if type == 1 else f"{payload['name']} ({type})"
+
+
+def hash_payload(payload: Dict[str, Any]) -> str:
+    """
+    This function hashes a command payload, independent of the order of its keys.
+
+    Args:
+        payload (Dict[str, Any]): The payload of the command.
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CommandSyncer:
+    """
+    This class syncs the command tree, uploading only what changed since the last sync.
+
+    The hash of every translated command payload is stored per scope in a local file.
+    The file only knows about syncs made from this machine, force a sync after the
+    commands were synced from elsewhere.
+
+    Attributes:
+        bot (commands.Bot): The bot whose command tree is synced.
+        path (Path): The file the hashes are stored in.
+    """
+
+    def __init__(self, bot: commands.Bot, path: str = "command_sync.json") -> None:
+        self.bot = bot
+        self.path = Path(path)
+
+    def load_hashes(self) -> Dict[str, Dict[str, str]]:
+        """
+        This method loads the stored hashes.
+
+        Returns:
+            Dict[str, Dict[str, str]]: The hash of every command, per scope.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logging.warning(f"[CommandSyncer]Ignoring corrupt {self.path}")
+            return {}
+
+    def save_hashes(self, hashes: Dict[str, Dict[str, str]]) -> None:
+        """
+        This method stores the hashes, replacing the file atomically.
+
+        Args:
+            hashes (Dict[str, Dict[str, str]]): The hash of every command, per scope.
+
+        Returns:
+            None
+        """
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+        tmp.replace(self.path)
+
+    async def sync(
+        self, guild: Optional[Snowflake] = None, force: bool = False
+    ) -> SyncReport:
+        """
+        This method syncs the commands of a scope.
+
+        Nothing is uploaded if every hash matches the stored one. If commands were only
+        added or changed, each of them is upserted on its own. Removing a command, or a
+        scope that was never synced from here, needs the whole tree to be uploaded.
+
+        Args:
+            guild (Optional[Snowflake]): The guild to sync, None for the global commands.
+            force (bool): Whether to upload the whole tree even if nothing changed.
+
+        Raises:
+            app_commands.MissingApplicationID: The bot has no application id yet.
+
+        Returns:
+            SyncReport: What was uploaded and how long each phase took.
+        """
+        if self.bot.application_id is None:
+            raise app_commands.MissingApplicationID
+        tree = self.bot.tree
+        scope = "global" if guild is None else str(guild.id)
+        timings = {}
+
+        start = time.perf_counter()
+        payloads = {}
+        for command in tree.get_commands(guild=guild):
+            if tree.translator is None:
+                payload = command.to_dict()
+            else:
+                payload = await command.get_translated_payload(tree.translator)
+            payloads[command_key(payload)] = payload
+        timings["translate"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hashes = self.load_hashes()
+        old = hashes.get(scope, {})
+        new = {key: hash_payload(payload) for key, payload in payloads.items()}
+        added = sorted(key for key in new if key not in old)
+        changed = sorted(key for key in new if key in old and old[key] != new[key])
+        removed = sorted(key for key in old if key not in new)
+        timings["diff"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # without stored hashes, commands registered on Discord may be missing locally
+        if force or removed or scope not in hashes:
+            mode = "bulk"
+            await self.upload(guild, list(payloads.values()))
+        elif added or changed:
+            mode = "narrow"
+            for key in added + changed:
+                await self.upload_one(guild, payloads[key])
+        else:
+            mode = "skipped"
+        timings["upload"] = time.perf_counter() - start
+
+        if mode != "skipped":
+            start = time.perf_counter()
+            hashes[scope] = new
+            self.save_hashes(hashes)
+            timings["save"] = time.perf_counter() - start
+
+        report = SyncReport(
+            scope=scope,
+            mode=mode,
+            added=added,
+            changed=changed,
+            removed=removed,
+            timings=timings,
+        )
+        logging.info(f"[CommandSyncer]Synced commands: {report}")
+        return report
+
+    async def upload(
+        self, guild: Optional[Snowflake], payload: List[Dict[str, Any]]
+    ) -> None:
+        """
+        This method replaces every command of a scope.
+
+        Args:
+            guild (Optional[Snowflake]): The guild to sync, None for the global commands.
+            payload (List[Dict[str, Any]]): The payloads of all the commands.
+
+        Returns:
+            None
+        """
+        if guild is None:
+            await self.bot.http.bulk_upsert_global_commands(
+                self.bot.application_id, payload=payload
+            )
+        else:
+            await self.bot.http.bulk_upsert_guild_commands(
+                self.bot.application_id, guild.id, payload=payload
+            )
+
+    async def upload_one(
+        self, guild: Optional[Snowflake], payload: Dict[str, Any]
+    ) -> None:
+        """
+        This method creates or replaces a single command of a scope.
+
+        Args:
+            guild (Optional[Snowflake]): The guild to sync, None for the global commands.
+            payload (Dict[str, Any]): The payload of the command.
+
+        Returns:
+            None
+        """
+        if guild is None:
+            await self.bot.http.upsert_global_command(self.bot.application_id, payload)
+        else:
+            await self.bot.http.upsert_guild_command(
+                self.bot.application_id, guild.id, payload
+            )
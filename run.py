@@ -1,13 +1,17 @@
 import logging
 import os
+from logging.handlers import QueueListener
 from pathlib import Path
+from typing import Optional
 
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
 from models.bot import Bot, BotTranslator
+from models.clock import Clock
 from models.db.database import DataBase
+from models.log import setup_logging
 
 
 class ScheduleBot(Bot):
@@ -19,7 +23,9 @@ class ScheduleBot(Bot):
             activity=discord.Game(name="/s add"),
             owner_ids=(410036441129943050, 260083371819008000, 274853284764975104),
         )
-        self.db = DataBase()
+        self.clock = Clock()
+        self.db = DataBase(clock=self.clock)
+        self.log_listener: Optional[QueueListener] = None
 
     async def setup_hook(self) -> None:
         """
@@ -50,26 +56,18 @@ class ScheduleBot(Bot):
         """
         Set up logging for the bot.
 
-        This function sets up basic logging to a file named "schedule_bot.log" and to the console.
+        This function routes logging through a queue to a background thread, which writes
+        JSON lines to a rotating file named "schedule_bot.log" and plain lines to the console.
 
         Returns:
             None
         """
-        # setup basic logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s %(levelname)s %(name)s %(message)s",
-            datefmt="%y-%m-%d %H:%M:%S",
-            filename="schedule_bot.log",
-            filemode="w",
+        self.log_listener = setup_logging(
+            "schedule_bot.log",
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
         )
 
-        console = logging.StreamHandler()
-        console.setLevel(logging.INFO)
-        formatter = logging.Formatter("%(levelname)s %(name)s %(message)s")
-        console.setFormatter(formatter)
-        logging.getLogger("").addHandler(console)
-
     async def load_cogs(self) -> None:
         """
         Load all cogs in the 'cogs' folder.
@@ -134,6 +132,27 @@ class ScheduleBot(Bot):
         logging.error(f"[Bot]Error in command {ctx.command}: {error}")
         await ctx.send(f"An error occurred: {error}")
 
+    async def on_message_edit(
+        self, before: discord.Message, after: discord.Message
+    ) -> None:
+        """
+        This method is called when a message is edited.
+
+        This method processes commands in the edited message if the author is a bot owner.
+
+        Args:
+            before (discord.Message): The message before it was edited.
+            after (discord.Message): The message after it was edited.
+
+        Returns:
+            None
+        """
+        if before.content == after.content or not any(
+            before.author.id == id for id in self.owner_ids
+        ):
+            return
+        await self.process_commands(after)
+
     async def close(self) -> None:
         """
         This method is called when the bot is closed.
@@ -146,34 +165,15 @@ class ScheduleBot(Bot):
         await self.db.close()
         await super().close()
         logging.info("[Bot]Closed bot")
-
-
-bot = ScheduleBot()
-
-
-@bot.listen()
-async def on_message_edit(before: discord.Message, after: discord.Message) -> None:
-    """
-    This function is called when a message is edited.
-
-    This function processes commands in the edited message if the author is a bot owner.
-
-    Args:
-        before (discord.Message): The message before it was edited.
-        after (discord.Message): The message after it was edited.
-
-    Returns:
-        None
-    """
-    if before.content == after.content or not any(
-        before.author.id == id for id in bot.owner_ids
-    ):
-        return
-    await bot.process_commands(after)
-
-
-load_dotenv()
-token = os.getenv("TOKEN")
-if token is None:
-    raise ValueError("TOKEN environment variable not set")
-bot.run(token)
\ No newline at end of file
+        if self.log_listener is not None:
+            self.log_listener.stop()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    token = os.getenv("TOKEN")
+    if token is None:
+        raise ValueError("TOKEN environment variable not set")
+    bot = ScheduleBot()
+    # discord.py's own logs go through the root logger's queue as well
+    bot.run(token, log_handler=None)
@@ -1,4 +1,6 @@
 import datetime
+import re
+from typing import List
 
 from pytz import timezone
 
@@ -11,3 +13,55 @@ def get_dt_now() -> datetime.datetime:
         datetime.datetime: The current datetime with the timezone set to "Asia/Taipei".
     """
     return datetime.datetime.now(tz=timezone("Asia/Taipei"))
+
+
+OFFSET_UNITS = {"w": 7 * 24 * 60, "d": 24 * 60, "h": 60, "m": 1}
+MAX_OFFSETS = 5
+# the longest lead time, in minutes
+MAX_OFFSET = 52 * OFFSET_UNITS["w"]
+
+
+def parse_offsets(text: str) -> List[int]:
+    """
+    This function parses the lead times of advance reminders, such as "1d, 1h, 10m".
+
+    Args:
+        text (str): The lead times separated by commas or spaces, in weeks, days, hours or minutes.
+
+    Raises:
+        ValueError: A lead time is invalid, longer than MAX_OFFSET or there are more than MAX_OFFSETS of them.
+
+    Returns:
+        List[int]: The lead times in minutes.
+    """
+    offsets = []
+    for part in re.split(r"[,\s]+", text.strip().lower()):
+        if not part:
+            continue
+        match = re.fullmatch(r"(\d+)([wdhm])", part)
+        if match is None or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid lead time: {part}")
+        offset = int(match.group(1)) * OFFSET_UNITS[match.group(2)]
+        if offset > MAX_OFFSET:
+            raise ValueError(f"Lead time too long: {part}")
+        offsets.append(offset)
+    if len(offsets) > MAX_OFFSETS:
+        raise ValueError(f"At most {MAX_OFFSETS} lead times are allowed")
+    return offsets
+
+
+def format_offset(minutes: int) -> str:
+    """
+    This function formats a lead time the way parse_offsets reads it, in the largest unit that divides it.
+
+    Args:
+        minutes (int): The lead time in minutes.
+
+    Returns:
+        str: The lead time, such as "1d" or "25h".
+    """
+    # minutes divide every lead time
+    for unit, size in OFFSET_UNITS.items():
+        if minutes % size == 0:
+            break
+    return f"{minutes // size}{unit}"